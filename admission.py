@@ -0,0 +1,138 @@
+"""
+Admission Control
+
+Requests are grouped into route classes (catalog reads, order intake, admin),
+and each class gets its own concurrency limit and bounded FIFO queue. A flood
+of catalog reads therefore fills only the catalog queue, while orders keep
+their own slots. When a class's queue is full, or a request waits longer than
+the class's queue timeout, the request fails fast with 503 and Retry-After.
+This beats letting it time out on the client after the work was done anyway.
+
+Per class (CATALOG, ORDERS, ADMIN) the limits come from
+ADMISSION_<CLASS>_LIMIT, ADMISSION_<CLASS>_QUEUE and ADMISSION_<CLASS>_TIMEOUT
+(seconds). Routes outside every class, such as probes, metrics and docs, are
+never limited. Set ADMISSION_CONTROL=false to disable.
+"""
+
+import asyncio
+import os
+import time
+from typing import Optional
+
+from codec import dumps
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_QUEUE_WAIT, ADMISSION_REJECTED
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+# (path prefix, route class); first match wins
+ROUTE_CLASSES = [
+    ("/admin", "admin"),
+    ("/orders", "orders"),
+    ("/products", "catalog"),
+    ("/business", "catalog"),
+]
+
+# class -> (concurrency limit, queue size, queue timeout in seconds)
+_DEFAULTS = {
+    "catalog": (64, 256, 1.0),
+    "orders": (32, 512, 5.0),
+    "admin": (8, 32, 10.0),
+}
+
+
+def route_class(path: str) -> Optional[str]:
+    for prefix, name in ROUTE_CLASSES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return name
+    return None
+
+
+class AdmissionGate:
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float):
+        self.name = name
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(limit)
+        self._waiting = 0
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot, or return why the request was rejected"""
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return None
+        if self._waiting >= self.queue_size:
+            return "queue_full"
+        self._waiting += 1
+        ADMISSION_QUEUE_DEPTH.labels(self.name).set(self._waiting)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            return "timeout"
+        finally:
+            self._waiting -= 1
+            ADMISSION_QUEUE_DEPTH.labels(self.name).set(self._waiting)
+        ADMISSION_QUEUE_WAIT.labels(self.name).observe(time.perf_counter() - start)
+        return None
+
+    def release(self):
+        self._slots.release()
+
+
+def gates_from_env() -> dict:
+    gates = {}
+    for name, (limit, queue_size, queue_timeout) in _DEFAULTS.items():
+        prefix = f"ADMISSION_{name.upper()}_"
+        gates[name] = AdmissionGate(
+            name,
+            int(os.getenv(prefix + "LIMIT", str(limit))),
+            int(os.getenv(prefix + "QUEUE", str(queue_size))),
+            float(os.getenv(prefix + "TIMEOUT", str(queue_timeout))),
+        )
+    return gates
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying the per-class gates"""
+
+    def __init__(self, app, gates: dict = None, enabled: bool = ADMISSION_CONTROL):
+        self.app = app
+        self.gates = gates if gates is not None else gates_from_env()
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["path"])
+        gate = self.gates.get(name)
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        rejected = await gate.acquire()
+        if rejected:
+            ADMISSION_REJECTED.labels(name, rejected).inc()
+            await self._reject(send)
+            return
+        ADMISSION_IN_FLIGHT.labels(name).inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ADMISSION_IN_FLIGHT.labels(name).dec()
+            gate.release()
+
+    @staticmethod
+    async def _reject(send):
+        body = dumps({"detail": "Server is busy, retry later"})
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(ADMISSION_RETRY_AFTER).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
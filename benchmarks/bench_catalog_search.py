@@ -0,0 +1,114 @@
+"""
+Query latency of the in-memory catalog search index (catalog_search.py).
+
+Builds a synthetic catalog and checks the uncapped threshold-algorithm scores
+against a full BM25 scan. It then times a mix of one-word, multi-word and
+rare-word queries at the SEARCH_MAX_CANDIDATES cap, and reports how much of the
+exact top-N score the capped results keep:
+
+    python benchmarks/bench_catalog_search.py [--products 100000] [--queries 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson.objectid import ObjectId
+
+from catalog_search import SEARCH_MAX_CANDIDATES, SearchIndex, tokenize
+
+COLORS = ["red", "blue", "black", "green", "violet", "yellow", "white", "cyan", "magenta", "orange"]
+KINDS = ["ink", "cartridge", "toner", "refill", "bottle", "pen", "marker", "stamp", "pad", "printer"]
+WORDS = ["premium", "fast", "drying", "waterproof", "archival", "office", "home", "bulk", "pack", "eco",
+         "smooth", "bold", "fine", "industrial", "quick", "long", "lasting", "vivid", "matte", "gloss"]
+
+
+def make_docs(count: int, seed: int = 1) -> List[dict]:
+    rng = random.Random(seed)
+    docs = []
+    for i in range(count):
+        color, kind = rng.choice(COLORS), rng.choice(KINDS)
+        docs.append({
+            "_id": ObjectId(),
+            "title": f"{color.title()} {kind} {rng.choice(WORDS)} {i}",
+            "description": " ".join(rng.choice(WORDS + COLORS + KINDS) for _ in range(rng.randint(5, 40))),
+            "price": round(rng.uniform(10, 5000), 2),
+            "category": rng.choice(["ink", "home", "office"]),
+            "in_stock": rng.random() > 0.2,
+            "image_url": None,
+        })
+    return docs
+
+
+def make_queries(count: int, products: int, seed: int = 2) -> List[str]:
+    rng = random.Random(seed)
+    shapes = [
+        lambda: rng.choice(KINDS),
+        lambda: f"{rng.choice(COLORS)} {rng.choice(KINDS)}",
+        lambda: f"{rng.choice(WORDS)} {rng.choice(COLORS)} {rng.choice(KINDS)}",
+        lambda: f"{rng.choice(KINDS)} {rng.randrange(products)}",
+    ]
+    return [rng.choice(shapes)() for _ in range(count)]
+
+
+def scores(index: SearchIndex, query: str, product_ids: List[str]) -> List[float]:
+    terms = [t for t in dict.fromkeys(tokenize(query)) if t in index._postings]
+    return [round(sum(index._idf(t) * index._postings[t].get(pid, 0.0) for t in terms), 9) for pid in product_ids]
+
+
+def full_scan(index: SearchIndex, query: str, limit: int) -> List[str]:
+    terms = [t for t in dict.fromkeys(tokenize(query)) if t in index._postings]
+    scores = {}
+    for term in terms:
+        idf = index._idf(term)
+        for product_id, weight in index._postings[term].items():
+            scores[product_id] = scores.get(product_id, 0.0) + idf * weight
+    return [pid for _, pid in sorted(((s, pid) for pid, s in scores.items()), reverse=True)[:limit]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    docs = make_docs(args.products)
+    start = time.perf_counter()
+    index = SearchIndex(docs)
+    build = time.perf_counter() - start
+    queries = make_queries(args.queries, args.products)
+
+    # Products with equal scores may be ordered differently, so compare scores
+    recall = []
+    for query in queries[:50]:
+        expected = scores(index, query, full_scan(index, query, args.limit))
+        index.max_candidates = args.products
+        assert scores(index, query, index.search(query, args.limit)) == expected, query
+        index.max_candidates = SEARCH_MAX_CANDIDATES
+        recall.append(sum(scores(index, query, index.search(query, args.limit))) / sum(expected) if expected else 1.0)
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search_json(query, args.limit)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    start = time.perf_counter()
+    for doc in docs[:1000]:
+        index.upsert(str(doc["_id"]), dict(doc, title=doc["title"] + " refreshed"))
+    upsert = (time.perf_counter() - start) / 1000
+
+    print(f"products: {args.products}  build: {build:.2f} s")
+    print(f"query p50: {timings[len(timings) // 2] * 1e6:8.1f} us")
+    print(f"query p99: {timings[int(len(timings) * 0.99)] * 1e6:8.1f} us")
+    print(f"query max: {timings[-1] * 1e6:8.1f} us")
+    print(f"top-{args.limit} score kept at {SEARCH_MAX_CANDIDATES} candidates: "
+          f"mean {sum(recall) / len(recall):.1%}, worst {min(recall):.1%}")
+    print(f"upsert:    {upsert * 1e6:8.1f} us/product")
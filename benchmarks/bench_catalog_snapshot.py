@@ -0,0 +1,50 @@
+"""
+Build time and size of the pre-encoded /products snapshots (catalog_snapshot.py).
+
+Builds a Snapshot over the synthetic catalog from bench_catalog_search.py,
+including products without a category, checks every body against a plain
+encode of the same products, then reports build time and bytes per encoding:
+
+    python benchmarks/bench_catalog_snapshot.py [--products 100000]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_catalog_search import make_docs
+from catalog_snapshot import ENCODINGS, Snapshot
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    args = parser.parse_args()
+
+    docs = make_docs(args.products)
+    # Uncategorized products must land in the full catalog only
+    docs[0]["category"] = None
+    del docs[1]["category"]
+
+    start = time.perf_counter()
+    snapshot = Snapshot(1, docs)
+    build = time.perf_counter() - start
+
+    full = json.loads(snapshot.body(None, "identity"))
+    assert len(full) == len(docs)
+    assert json.loads(gzip.decompress(snapshot.body(None, "gzip"))) == full
+    categories = {doc.get("category") for doc in docs} - {None}
+    for category in categories:
+        assert json.loads(snapshot.body(category, "identity")) == [p for p in full if p["category"] == category], category
+    assert sum(len(json.loads(snapshot.body(c, "identity"))) for c in categories) == len(docs) - 2
+    assert snapshot.body("missing", "identity") == b"[]"
+
+    print(f"products: {args.products}  build: {build:.2f} s")
+    for encoding in ENCODINGS:
+        size = sum(len(variants[encoding]) for variants in snapshot.bodies.values())
+        print(f"{encoding:>8}: {size / 2**20:8.1f} MiB across {len(snapshot.bodies)} bodies")
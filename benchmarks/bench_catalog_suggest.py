@@ -0,0 +1,71 @@
+"""
+Per-keystroke latency and memory footprint of title suggestions (catalog_suggest.py).
+
+Builds the suggestion index over the synthetic catalog from
+bench_catalog_search.py, then replays customers typing product titles one
+character at a time:
+
+    python benchmarks/bench_catalog_suggest.py [--products 100000] [--typed 500]
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_catalog_search import make_docs
+from catalog_suggest import SuggestIndex
+
+
+def keystrokes(docs: list, count: int, seed: int = 3) -> list:
+    """Every prefix of `count` titles, typed from the first or a later word"""
+    rng = random.Random(seed)
+    prefixes = []
+    for doc in rng.sample(docs, min(count, len(docs))):
+        words = doc["title"].lower().split()
+        text = " ".join(words[rng.randrange(len(words)):])
+        prefixes.extend(text[:i] for i in range(1, min(len(text), 20) + 1))
+    return prefixes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--typed", type=int, default=500, help="Titles to type")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    docs = make_docs(args.products)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = SuggestIndex(docs)
+    build = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    prefixes = keystrokes(docs, args.typed)
+    timings = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.suggest(prefix, args.limit)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    start = time.perf_counter()
+    for doc in docs[:1000]:
+        index.upsert(str(doc["_id"]), dict(doc, in_stock=not doc["in_stock"]))
+    upsert = (time.perf_counter() - start) / 1000
+
+    print(f"products: {args.products}  build: {build:.2f} s  memory: {memory / 2**20:.1f} MiB "
+          f"({memory / args.products:.0f} B/product)")
+    print(f"keystrokes: {len(prefixes)}")
+    print(f"keystroke p50: {timings[len(timings) // 2] * 1e6:8.1f} us")
+    print(f"keystroke p99: {timings[int(len(timings) * 0.99)] * 1e6:8.1f} us")
+    print(f"keystroke max: {timings[-1] * 1e6:8.1f} us")
+    print(f"upsert:        {upsert * 1e6:8.1f} us/product")
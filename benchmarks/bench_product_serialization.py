@@ -0,0 +1,89 @@
+"""
+Per-item cost of serializing the /products response.
+
+Compares the previous read path (Product(**doc) per document, then FastAPI's
+response_model validation + jsonable_encoder + json.dumps) with the trusted
+path in serializers.py, on a synthetic catalog:
+
+    python benchmarks/bench_product_serialization.py [--products 10000] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson.objectid import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from schemas import Product
+from serializers import product_list_json
+
+
+def make_docs(count: int) -> List[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Product {i}",
+            "description": "Long product description " * 8,
+            "price": float(i % 500) + 0.99,
+            "category": ("ink", "home", "office")[i % 3],
+            "in_stock": i % 7 != 0,
+            "image_url": f"https://example.com/img/{i}.jpg",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+_response_field = create_response_field(name="Response_list_products", type_=List[Product])
+
+
+def validated_path(docs: List[dict]) -> bytes:
+    out = []
+    for d in docs:
+        d = dict(d)
+        d.pop("_id", None)
+        out.append(Product(**d))
+    content = asyncio.run(serialize_response(field=_response_field, response_content=out))
+    return JSONResponse(content).body
+
+
+def trusted_path(docs: List[dict]) -> bytes:
+    return product_list_json(docs)
+
+
+def bench(fn, docs: List[dict], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(docs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    docs = make_docs(args.products)
+    assert validated_path(docs[:50]) == JSONResponse(json.loads(trusted_path(docs[:50]))).body
+
+    before = bench(validated_path, docs, args.repeat)
+    after = bench(trusted_path, docs, args.repeat)
+    print(f"products: {args.products}")
+    print(f"validated path: {before * 1000:8.2f} ms total  {before / args.products * 1e6:6.2f} us/item")
+    print(f"trusted path:   {after * 1000:8.2f} ms total  {after / args.products * 1e6:6.2f} us/item")
+    print(f"speedup:        {before / after:8.1f}x")
@@ -0,0 +1,40 @@
+"""
+Compare two load test reports from benchmarks/loadtest.py:
+
+    python benchmarks/compare.py before.json after.json
+"""
+
+import argparse
+import json
+
+
+def _delta(before: float, after: float) -> str:
+    if not before:
+        return "   n/a"
+    return f"{(after - before) / before * 100:+6.1f}%"
+
+
+def compare(before: dict, after: dict):
+    print(f"{before['commit']} -> {after['commit']}")
+    header = f"{'route':<20} {'rps':>18} {'':>7} {'p50 ms':>18} {'p99 ms':>18} {'':>7} {'errors':>13}"
+    print(header)
+    print("-" * len(header))
+    rows = [("TOTAL", before["total"], after["total"])]
+    rows += [(name, before["routes"][name], after["routes"][name])
+             for name in after["routes"] if name in before["routes"]]
+    for name, b, a in rows:
+        print(
+            f"{name:<20} {b['rps']:>8.1f} -> {a['rps']:>6.1f} {_delta(b['rps'], a['rps'])} "
+            f"{b['p50_ms']:>8.2f} -> {a['p50_ms']:>6.2f} "
+            f"{b['p99_ms']:>8.2f} -> {a['p99_ms']:>6.2f} {_delta(b['p99_ms'], a['p99_ms'])} "
+            f"{b['error_rate']:>5.2%} -> {a['error_rate']:>5.2%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two load test JSON reports")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+    with open(args.before) as f, open(args.after) as g:
+        compare(json.load(f), json.load(g))
@@ -0,0 +1,442 @@
+"""
+End-to-end load test for every route in main.py.
+
+Drives a weighted mix of requests at a fixed concurrency and reports RPS,
+p50/p95/p99 latency and error rate per route as JSON, so runs can be compared
+between commits with benchmarks/compare.py.
+
+Offline, against an in-memory Mongo stand-in and a local SMTP sink:
+
+    python benchmarks/loadtest.py --spawn memory --output before.json
+
+Against a local mongod (the app is started with serve.py, N workers). The
+--mongo-db database is dropped before seeding and again on exit, so every run
+starts from the same catalog:
+
+    python benchmarks/loadtest.py --spawn mongod --mongo-url mongodb://localhost:27017 --workers 4
+
+Against a server that is already running:
+
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:8000 --admin-token changeme
+
+The mix is name=weight pairs, e.g. --mix products=50,order=10,admin_create=1.
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from smtp_sink import SMTPSink
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CATEGORIES = ["ink", "home", "office", "garden", "kitchen"]
+
+
+# ---------- Scenarios ----------
+# Each scenario issues one request and returns the response.
+
+def _product(rng: random.Random, i: int) -> dict:
+    return {
+        "title": f"Load product {i}",
+        "description": "Load test product " * rng.randint(1, 10),
+        "price": round(rng.uniform(1, 500), 2),
+        "category": rng.choice(CATEGORIES),
+        "in_stock": rng.random() > 0.2,
+        "image_url": f"https://example.com/{i}.jpg",
+    }
+
+
+async def products(client, state):
+    return await client.get("/products")
+
+
+async def products_category(client, state):
+    return await client.get("/products", params={"category": state.rng.choice(CATEGORIES)})
+
+
+async def products_page(client, state):
+    params = {"limit": 50}
+    if state.cursor:
+        params["cursor"] = state.cursor
+    response = await client.get("/products", params=params)
+    if response.status_code == 200:
+        state.cursor = response.json().get("next_cursor")
+    return response
+
+
+async def products_fields(client, state):
+    return await client.get("/products", params={"fields": "title,price,category"})
+
+
+async def products_facets(client, state):
+    params = [("category", c) for c in state.rng.sample(CATEGORIES, state.rng.randint(0, 2))]
+    params += [("min_price", state.rng.choice([0, 100])), ("limit", 20), ("facets", "true")]
+    return await client.get("/products", params=params)
+
+
+async def products_etag(client, state):
+    headers = {"If-None-Match": state.etag} if state.etag else {}
+    response = await client.get("/products", headers=headers)
+    state.etag = response.headers.get("etag", state.etag)
+    return response
+
+
+async def products_search(client, state):
+    query = state.rng.choice(["load", "product", "test"]) + " " + state.rng.choice(CATEGORIES)
+    return await client.get("/products/search", params={"q": query})
+
+
+async def products_suggest(client, state):
+    # One request per keystroke of "load product"
+    word = "load product"
+    return await client.get("/products/suggest", params={"prefix": word[:state.rng.randint(1, len(word))]})
+
+
+async def business(client, state):
+    return await client.get("/business")
+
+
+async def order(client, state):
+    return await client.post("/orders/ink", json={
+        "customer_name": "Load Test",
+        "customer_email": "load@example.com",
+        "color": state.rng.choice(["Red", "Blue"]),
+        "quantity_liters": state.rng.randint(1, 20),
+    })
+
+
+async def admin_products(client, state):
+    return await client.get("/admin/products", params={"limit": 100}, headers=state.admin)
+
+
+async def admin_create(client, state):
+    response = await client.post("/admin/products", json=_product(state.rng, state.next_index()), headers=state.admin)
+    if response.status_code == 200:
+        state.created.append(response.json()["id"])
+    return response
+
+
+async def admin_update(client, state):
+    product_id = state.rng.choice(state.product_ids)
+    return await client.put(f"/admin/products/{product_id}", json=_product(state.rng, state.next_index()), headers=state.admin)
+
+
+async def admin_delete(client, state):
+    if not state.created:
+        await admin_create(client, state)
+    product_id = state.created.pop() if state.created else "0" * 24
+    return await client.delete(f"/admin/products/{product_id}", headers=state.admin)
+
+
+async def admin_bulk(client, state):
+    items = [_product(state.rng, state.next_index()) for _ in range(100)]
+    response = await client.post("/admin/products/bulk", json=items, headers=state.admin)
+    if response.status_code == 200:
+        # Bulk deletes remove these, so the catalog does not only grow
+        state.created.extend(r["id"] for r in response.json()["results"] if "id" in r)
+    return response
+
+
+async def admin_bulk_update(client, state):
+    items = [dict(_product(state.rng, state.next_index()), id=product_id)
+             for product_id in state.rng.sample(state.product_ids, min(100, len(state.product_ids)))]
+    return await client.put("/admin/products/bulk", json=items, headers=state.admin)
+
+
+async def admin_bulk_delete(client, state):
+    if len(state.created) < 100:
+        await admin_bulk(client, state)
+    ids = [state.created.pop() for _ in range(min(100, len(state.created)))]
+    return await client.request("DELETE", "/admin/products/bulk", json={"ids": ids}, headers=state.admin)
+
+
+async def admin_import(client, state):
+    # Upserts onto seeded titles, so repeated imports keep the catalog size
+    body = io.StringIO()
+    writer = csv.DictWriter(body, fieldnames=list(_product(state.rng, 0)))
+    writer.writeheader()
+    for _ in range(100):
+        writer.writerow(_product(state.rng, state.rng.randint(1, max(1, len(state.product_ids)))))
+    return await client.post("/admin/products/import", params={"format": "csv", "upsert_key": "title"},
+                             content=body.getvalue().encode(), headers=dict(state.admin, **{"Content-Type": "text/csv"}))
+
+
+async def admin_business(client, state):
+    return await client.get("/admin/business", headers=state.admin)
+
+
+async def admin_business_put(client, state):
+    return await client.put("/admin/business", json=state.business, headers=state.admin)
+
+
+SCENARIOS = {
+    "products": products,
+    "products_category": products_category,
+    "products_page": products_page,
+    "products_fields": products_fields,
+    "products_etag": products_etag,
+    "products_facets": products_facets,
+    "products_search": products_search,
+    "products_suggest": products_suggest,
+    "business": business,
+    "order": order,
+    "admin_products": admin_products,
+    "admin_create": admin_create,
+    "admin_update": admin_update,
+    "admin_delete": admin_delete,
+    "admin_bulk": admin_bulk,
+    "admin_bulk_update": admin_bulk_update,
+    "admin_bulk_delete": admin_bulk_delete,
+    "admin_import": admin_import,
+    "admin_business": admin_business,
+    "admin_business_put": admin_business_put,
+}
+
+DEFAULT_MIX = {
+    "products": 25, "products_category": 15, "products_page": 10, "products_fields": 5,
+    "products_etag": 10, "products_facets": 5, "products_search": 5, "products_suggest": 5,
+    "business": 10, "order": 15, "admin_products": 2, "admin_create": 2,
+    "admin_update": 2, "admin_delete": 1, "admin_bulk": 1, "admin_bulk_update": 1, "admin_bulk_delete": 1,
+    "admin_import": 1, "admin_business": 1, "admin_business_put": 1,
+}
+
+
+class State:
+    def __init__(self, seed: int, admin_token: str):
+        self.rng = random.Random(seed)
+        self.admin = {"X-Admin-Token": admin_token}
+        self.business = {"name": "Load Test Enterprise", "email": "owner@example.com", "city": "Pune"}
+        self.product_ids = []
+        self.created = []
+        self.cursor = None
+        self.etag = None
+        self._index = 0
+
+    def next_index(self) -> int:
+        self._index += 1
+        return self._index
+
+
+def parse_mix(text: str) -> dict:
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ---------- Running ----------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def drop_database(args):
+    """Start --spawn mongod runs from an empty database, and leave none behind"""
+    from pymongo import MongoClient
+
+    client = MongoClient(args.mongo_url, serverSelectionTimeoutMS=5000)
+    try:
+        client.drop_database(args.mongo_db)
+    finally:
+        client.close()
+
+
+def spawn_server(args, smtp_port: int):
+    port = _free_port()
+    env = dict(os.environ, ADMIN_TOKEN=args.admin_token, SMTP_HOST="127.0.0.1", SMTP_PORT=str(smtp_port), SMTP_TLS="false")
+    env.pop("SMTP_USER", None)
+    if args.spawn == "memory":
+        app_dir, target = os.path.join(ROOT, "benchmarks"), "memory_app:app"
+        env["LOADTEST_EMAIL_WORKER"] = "true"
+        cmd = [sys.executable, "-m", "uvicorn", "--app-dir", app_dir, target,
+               "--host", "127.0.0.1", "--port", str(port), "--workers", "1", "--log-level", "warning"]
+    else:
+        # The production launcher, so worker scaling is measured as deployed
+        env.update(DATABASE_URL=args.mongo_url, DATABASE_NAME=args.mongo_db, BIND=f"127.0.0.1:{port}",
+                   WEB_CONCURRENCY=str(args.workers), LOG_LEVEL="warning")
+        cmd = [sys.executable, "serve.py"]
+    process = subprocess.Popen(cmd, env=env, cwd=ROOT)
+    worker = None
+    if args.spawn == "mongod":
+        worker = subprocess.Popen([sys.executable, "email_outbox.py"], env=env, cwd=ROOT)
+    return f"http://127.0.0.1:{port}", process, worker
+
+
+async def wait_ready(client, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("Server did not become ready")
+
+
+async def seed(client, state, count: int):
+    response = await client.put("/admin/business", json=state.business, headers=state.admin)
+    response.raise_for_status()
+    for start in range(0, count, 1000):
+        items = [_product(state.rng, state.next_index()) for _ in range(min(1000, count - start))]
+        response = await client.post("/admin/products/bulk", json=items, headers=state.admin)
+        response.raise_for_status()
+        state.product_ids.extend(r["id"] for r in response.json()["results"] if "id" in r)
+
+
+async def catalog_size(client) -> int:
+    response = await client.get("/products", params={"limit": 1, "include_total": "true"})
+    response.raise_for_status()
+    return response.json()["total"]
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+    }
+
+
+async def run_load(client, state, mix: dict, concurrency: int, duration: float):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = {name: ([], [0]) for name in names}
+    deadline = time.monotonic() + duration
+
+    async def user():
+        while time.monotonic() < deadline:
+            name = state.rng.choices(names, weights)[0]
+            latencies, errors = results[name]
+            start = time.perf_counter()
+            try:
+                response = await SCENARIOS[name](client, state)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            if failed:
+                errors[0] += 1
+
+    start = time.monotonic()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.monotonic() - start
+
+    routes = {name: summarize(latencies, errors[0], elapsed) for name, (latencies, errors) in results.items()}
+    all_latencies = [value for latencies, _ in results.values() for value in latencies]
+    total = summarize(all_latencies, sum(errors[0] for _, errors in results.values()), elapsed)
+    return elapsed, routes, total
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main(args) -> dict:
+    mix = parse_mix(args.mix)
+    state = State(args.seed, args.admin_token)
+    sink = SMTPSink()
+    smtp_port = await sink.start()
+    process = worker = None
+    base_url = args.base_url
+    if args.spawn == "mongod":
+        drop_database(args)
+    if args.spawn:
+        base_url, process, worker = spawn_server(args, smtp_port)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+            await wait_ready(client)
+            await seed(client, state, args.products)
+            if args.warmup:
+                await run_load(client, state, mix, args.concurrency, args.warmup)
+            # Admin scenarios grow the catalog; record it, since it affects every read route
+            catalog_start = await catalog_size(client)
+            elapsed, routes, total = await run_load(client, state, mix, args.concurrency, args.duration)
+            catalog_end = await catalog_size(client)
+    finally:
+        for proc in (worker, process):
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=30)
+        await sink.stop()
+        if args.spawn == "mongod":
+            drop_database(args)
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "target": args.spawn or base_url, "workers": args.workers if args.spawn == "mongod" else None,
+            "concurrency": args.concurrency, "duration_s": args.duration, "products": args.products,
+            "catalog_products": {"start": catalog_start, "end": catalog_end},
+            "seed": args.seed, "mix": mix,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "total": total,
+        "routes": routes,
+        "emails_received": sink.received,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test every route of the API")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--base-url", help="Test a server that is already running")
+    target.add_argument("--spawn", choices=["memory", "mongod"], help="Start the app locally")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--mongo-db", default="loadtest", help="Dropped before and after the run (mongod only)")
+    parser.add_argument("--workers", type=int, default=1, help="serve.py workers (mongod only)")
+    parser.add_argument("--admin-token", default="loadtest-token")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds of unmeasured load first")
+    parser.add_argument("--products", type=int, default=1000, help="Products to seed")
+    parser.add_argument("--mix", help="Comma-separated scenario=weight pairs")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
@@ -0,0 +1,40 @@
+"""
+The app backed by an in-memory Mongo stand-in, for offline load tests.
+
+pymongo and motor clients are replaced by mongomock clients sharing one store
+before database.py is imported. Run it single-process only (each process has
+its own store):
+
+    uvicorn --app-dir benchmarks memory_app:app
+
+Set LOADTEST_EMAIL_WORKER=true to drain the email outbox in a background
+thread of the same process.
+"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mongomock
+import motor.motor_asyncio
+import pymongo
+from mongomock_motor import AsyncMongoMockClient
+
+_store = mongomock.MongoClient()
+pymongo.MongoClient = lambda *args, **kwargs: _store
+motor.motor_asyncio.AsyncIOMotorClient = lambda *args, **kwargs: AsyncMongoMockClient(mock_mongo_client=_store)
+
+os.environ.setdefault("DATABASE_URL", "mongodb://in-memory")
+os.environ.setdefault("DATABASE_NAME", "loadtest")
+# mongomock implements neither $indexStats nor background index builds
+os.environ.setdefault("ENSURE_INDEXES_ON_STARTUP", "false")
+
+import database  # noqa: E402
+from main import app  # noqa: E402,F401
+
+if os.getenv("LOADTEST_EMAIL_WORKER", "false").lower() in ("1", "true", "yes"):
+    from email_outbox import run_worker
+
+    threading.Thread(target=run_worker, args=(database.get_db(),), daemon=True, name="email-outbox").start()
@@ -0,0 +1,69 @@
+"""
+Worker scaling sweep for serve.py.
+
+Runs benchmarks/loadtest.py against a local mongod once per worker count and
+prints total RPS, p99 and scaling efficiency (RPS / (workers * RPS at the
+first count)):
+
+    python benchmarks/scale_workers.py --workers 1,2,4,8 --mongo-url mongodb://localhost:27017
+
+Every run starts from a freshly seeded database (loadtest.py drops it), so
+each worker count is measured against the same catalog. The load generator is
+a single process; give it its own cores (or a separate machine via
+loadtest.py --base-url) or it becomes the bottleneck before the server does. Extra arguments after -- are passed to loadtest.py.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run(workers: int, args, extra: list) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        subprocess.run(
+            [sys.executable, os.path.join(HERE, "loadtest.py"), "--spawn", "mongod",
+             "--mongo-url", args.mongo_url, "--workers", str(workers), "--concurrency", str(args.concurrency),
+             "--duration", str(args.duration), "--output", output.name, *extra],
+            check=True,
+        )
+        with open(output.name) as f:
+            return json.load(f)
+
+
+def main(args, extra: list) -> list:
+    counts = [int(n) for n in args.workers.split(",")]
+    rows = []
+    for workers in counts:
+        report = run(workers, args, extra)
+        rows.append({"workers": workers, "rps": report["total"]["rps"], "p99_ms": report["total"]["p99_ms"],
+                     "error_rate": report["total"]["error_rate"],
+                     "catalog_products": report["config"]["catalog_products"]["start"]})
+    base = rows[0]["rps"] / rows[0]["workers"] if rows and rows[0]["rps"] else 0
+    for row in rows:
+        row["efficiency"] = round(row["rps"] / (row["workers"] * base), 3) if base else None
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure RPS scaling across serve.py worker counts")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--output", help="Also write the rows as JSON here")
+    args, extra = parser.parse_known_args()
+    extra = [a for a in extra if a != "--"]
+
+    rows = main(args, extra)
+    print(f"{'workers':>7} {'rps':>10} {'p99 ms':>9} {'errors':>7} {'efficiency':>10}")
+    for row in rows:
+        efficiency = f"{row['efficiency']:.0%}" if row["efficiency"] is not None else "n/a"
+        print(f"{row['workers']:>7} {row['rps']:>10.1f} {row['p99_ms']:>9.2f} {row['error_rate']:>7.2%} {efficiency:>10}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
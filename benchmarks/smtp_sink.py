@@ -0,0 +1,94 @@
+"""
+Minimal local SMTP sink for load tests.
+
+Accepts any message, counts it and throws it away. No TLS or AUTH, so point
+the app at it with SMTP_TLS=false and no SMTP_USER:
+
+    python benchmarks/smtp_sink.py --port 2525
+"""
+
+import argparse
+import asyncio
+
+
+class SMTPSink:
+    def __init__(self):
+        self.received = 0
+        self.server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        loop = asyncio.get_running_loop()
+        self.server = await loop.create_server(lambda: _SinkProtocol(self), host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+class _SinkProtocol(asyncio.Protocol):
+    def __init__(self, sink: SMTPSink):
+        self.sink = sink
+        self.buffer = b""
+        self.in_data = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.write(b"220 smtp-sink ready\r\n")
+
+    def data_received(self, data: bytes):
+        self.buffer += data
+        while True:
+            if self.in_data:
+                end = self.buffer.find(b"\r\n.\r\n")
+                if end < 0:
+                    return
+                self.buffer = self.buffer[end + 5:]
+                self.in_data = False
+                self.sink.received += 1
+                self.transport.write(b"250 OK queued\r\n")
+                continue
+            line, sep, rest = self.buffer.partition(b"\r\n")
+            if not sep:
+                return
+            self.buffer = rest
+            self._command(line.decode("ascii", "replace").strip())
+
+    def _command(self, line: str):
+        verb = line.split(" ", 1)[0].upper()
+        if verb == "EHLO":
+            self.transport.write(b"250-smtp-sink\r\n250 8BITMIME\r\n")
+        elif verb == "DATA":
+            self.in_data = True
+            self.transport.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+        elif verb == "QUIT":
+            self.transport.write(b"221 Bye\r\n")
+            self.transport.close()
+        elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+            self.transport.write(b"250 OK\r\n")
+        else:
+            self.transport.write(b"502 Command not implemented\r\n")
+
+
+async def _serve(host: str, port: int):
+    sink = SMTPSink()
+    port = await sink.start(host, port)
+    print(f"SMTP sink listening on {host}:{port}")
+    try:
+        while True:
+            await asyncio.sleep(5)
+            print(f"received: {sink.received}")
+    finally:
+        await sink.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SMTP sink that discards messages")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
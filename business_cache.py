@@ -0,0 +1,65 @@
+"""
+Business Cache
+
+Process-level copy of the single ``business`` document. It is loaded at startup,
+reloaded right after ``admin_upsert_business`` writes, and reloaded when the
+``business`` write generation moves on (i.e. another worker wrote), so reads on
+the storefront and order paths normally cost no Mongo round-trip.
+"""
+
+import asyncio
+from typing import Optional
+
+from database import collection_generation_async, get_documents_async
+from schemas import Business
+
+
+class BusinessCache:
+    def __init__(self):
+        self._doc = None
+        self._business = None
+        self._json = b"null"
+        self._generation = None
+        self._lock = asyncio.Lock()
+
+    async def load(self, if_stale: bool = False):
+        """(Re)load the business document from Mongo
+
+        With if_stale=True, skip the reload when the cache already matches the
+        current generation, e.g. because another request reloaded it while this
+        one waited for the lock.
+        """
+        async with self._lock:
+            # Read the generation first so a concurrent write forces another reload
+            generation = await collection_generation_async("business")
+            if if_stale and generation == self._generation:
+                return
+            docs = await get_documents_async("business", {}, limit=1)
+            doc = docs[0] if docs else None
+            self._doc = doc
+            self._business = Business(**{k: v for k, v in doc.items() if k != "_id"}) if doc else None
+            # Serialized once per load so GET /business never re-validates
+            self._json = self._business.model_dump_json().encode() if self._business else b"null"
+            self._generation = generation
+
+    async def _ensure_current(self):
+        if self._generation is None or self._generation != await collection_generation_async("business"):
+            await self.load(if_stale=True)
+
+    async def get(self) -> Optional[Business]:
+        """Validated Business model, or None when not configured"""
+        await self._ensure_current()
+        return self._business
+
+    async def get_json(self) -> bytes:
+        """Business as JSON bytes ("null" when not configured)"""
+        await self._ensure_current()
+        return self._json
+
+    async def get_document(self) -> Optional[dict]:
+        """Raw business document (including _id and timestamps), or None"""
+        await self._ensure_current()
+        return dict(self._doc) if self._doc else None
+
+
+business_cache = BusinessCache()
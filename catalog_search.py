@@ -0,0 +1,281 @@
+"""
+Catalog Search
+
+GET /products/search is served from an in-process inverted index over the
+Product title, category and description fields, ranked with BM25. Each term's
+posting list is kept sorted by its BM25 term weight, so a query reads the
+lists best-first and stops as soon as no unseen product can beat the current
+top N (the threshold algorithm). Queries do not touch Mongo, and their cost
+depends on N rather than on the size of the catalog. Queries whose terms are
+all very common could still go deep into the lists. Scoring is therefore capped at
+SEARCH_MAX_CANDIDATES products, taken from the highest-weighted postings, which
+keeps the worst case bounded at the cost of exactness among near-ties.
+
+CatalogSearch keeps this index together with the title suggestion index
+(catalog_suggest.py), and builds both at startup. Admin product writes in this
+worker are applied incrementally, up to SEARCH_INCREMENTAL_LIMIT products per
+write. Anything else that moves the product write generation triggers a
+background rebuild: larger batches, or writes from another worker. Only one
+rebuild runs at a time, repeating until it has caught up with the latest
+generation, and the current indexes keep serving until each pass is done.
+"""
+
+import asyncio
+import heapq
+import logging
+import math
+import os
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional
+
+from catalog_suggest import SuggestIndex
+from database import collection_generation_async, get_documents_async
+from schemas import Product
+from serializers import json_bytes, product_dicts
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "300"))
+SEARCH_INCREMENTAL_LIMIT = int(os.getenv("SEARCH_INCREMENTAL_LIMIT", "100"))
+
+K1 = 1.2
+B = 0.75
+# Term frequencies are counted with these weights, so a title match outranks
+# the same word deep in a description
+FIELD_WEIGHTS = (("title", 3.0), ("category", 2.0), ("description", 1.0))
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def _term_frequencies(product: dict) -> Dict[str, float]:
+    frequencies = {}
+    for field, weight in FIELD_WEIGHTS:
+        for term in tokenize(product.get(field)):
+            frequencies[term] = frequencies.get(term, 0.0) + weight
+    return frequencies
+
+
+class SearchIndex:
+    """BM25 inverted index keyed by product id (str(_id))
+
+    The average document length is fixed when the index is built, so
+    incremental updates never reorder existing posting lists; it is refreshed
+    on the next full rebuild.
+    """
+
+    def __init__(self, docs: Iterable[dict] = (), max_candidates: int = SEARCH_MAX_CANDIDATES):
+        self.max_candidates = max_candidates
+        self._json = {}  # product id -> Product JSON bytes
+        self._terms = {}  # product id -> {term: weighted tf}
+        self._lengths = {}  # product id -> weighted length
+        self._postings = {}  # term -> {product id: BM25 term weight without idf}
+        self._ranked = {}  # term -> [(-weight, product id)] ascending, i.e. best first
+
+        docs = list(docs)
+        analyzed = [(str(doc["_id"]), doc, _term_frequencies(doc)) for doc in docs]
+        total_length = sum(sum(tf.values()) for _, _, tf in analyzed)
+        self.avg_length = total_length / len(analyzed) if analyzed else 0.0
+        for product_id, doc, frequencies in analyzed:
+            self._add(product_id, doc, frequencies, sort=False)
+        for ranked in self._ranked.values():
+            ranked.sort()
+
+    def __len__(self) -> int:
+        return len(self._json)
+
+    def _weight(self, tf: float, length: float) -> float:
+        norm = 1 - B + B * length / self.avg_length if self.avg_length else 1.0
+        return tf * (K1 + 1) / (tf + K1 * norm)
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings[term])
+        return math.log(1 + (len(self._json) - df + 0.5) / (df + 0.5))
+
+    def _add(self, product_id: str, doc: dict, frequencies: Dict[str, float], sort: bool = True):
+        length = sum(frequencies.values())
+        if not self.avg_length:
+            self.avg_length = length
+        self._json[product_id] = json_bytes(product_dicts([doc])[0])
+        self._terms[product_id] = frequencies
+        self._lengths[product_id] = length
+        for term, tf in frequencies.items():
+            weight = self._weight(tf, length)
+            self._postings.setdefault(term, {})[product_id] = weight
+            ranked = self._ranked.setdefault(term, [])
+            if sort:
+                insort(ranked, (-weight, product_id))
+            else:
+                ranked.append((-weight, product_id))
+
+    def upsert(self, product_id: str, product: dict):
+        """Index (or re-index) one product"""
+        self.remove(product_id)
+        self._add(product_id, product, _term_frequencies(product))
+
+    def remove(self, product_id: str):
+        frequencies = self._terms.pop(product_id, None)
+        if frequencies is None:
+            return
+        del self._json[product_id]
+        del self._lengths[product_id]
+        for term in frequencies:
+            postings = self._postings[term]
+            entry = (-postings.pop(product_id), product_id)
+            ranked = self._ranked[term]
+            del ranked[bisect_left(ranked, entry)]
+            if not postings:
+                del self._postings[term]
+                del self._ranked[term]
+
+    def search(self, query: str, limit: int = 20) -> List[str]:
+        """Product ids of the top `limit` matches for query, best first"""
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t in self._postings]
+        if not terms or limit <= 0:
+            return []
+        ranked_lists = [(self._idf(t), self._ranked[t]) for t in terms]
+        weights = [(self._idf(t), self._postings[t]) for t in terms]
+        top = []  # min-heap of (score, product id)
+        floor = -1.0  # lowest score in a full top
+        seen = set()
+        depth = 0
+        while True:
+            # Best score any product not yet seen could still reach
+            threshold = 0.0
+            exhausted = True
+            for idf, ranked in ranked_lists:
+                if depth >= len(ranked):
+                    continue
+                exhausted = False
+                neg_weight, product_id = ranked[depth]
+                threshold -= idf * neg_weight
+                if product_id in seen:
+                    continue
+                seen.add(product_id)
+                score = 0.0
+                for term_idf, postings in weights:
+                    weight = postings.get(product_id)
+                    if weight is not None:
+                        score += term_idf * weight
+                if len(top) < limit:
+                    heapq.heappush(top, (score, product_id))
+                    if len(top) == limit:
+                        floor = top[0][0]
+                elif score >= floor and (score, product_id) > top[0]:
+                    heapq.heapreplace(top, (score, product_id))
+                    floor = top[0][0]
+            if exhausted or floor >= threshold or len(seen) >= self.max_candidates:
+                break
+            depth += 1
+        return [product_id for _, product_id in sorted(top, reverse=True)]
+
+    def search_json(self, query: str, limit: int = 20) -> bytes:
+        """JSON array of the matching products, best first"""
+        return b"[" + b",".join(self._json[product_id] for product_id in self.search(query, limit)) + b"]"
+
+
+def _build_indexes(docs: List[dict]):
+    return SearchIndex(docs), SuggestIndex(docs)
+
+
+class CatalogSearch:
+    def __init__(self):
+        self._index = None
+        self._suggest = None
+        self._generation = -1
+        self._task = None
+        self._pass_done = asyncio.Event()  # set, then replaced, after every build pass
+
+    async def _build(self, generation: int):
+        projection = {name: 1 for name in Product.model_fields}
+        docs = await get_documents_async("product", {}, projection=projection)
+        # Tokenizing and sorting the whole catalog is CPU work; keep it off the loop
+        index, suggest = await asyncio.to_thread(_build_indexes, docs)
+        if self._index is None or generation >= self._generation:
+            self._index, self._suggest, self._generation = index, suggest, generation
+
+    async def _catch_up(self):
+        # Each pass builds the generation read when it starts, so writes that
+        # land during a pass cost one more pass, not one rebuild each
+        try:
+            while True:
+                generation = await collection_generation_async("product")
+                if self._index is not None and self._generation >= generation:
+                    return
+                await self._build(generation)
+                self._wake_waiters()
+        finally:
+            self._wake_waiters()
+
+    def _wake_waiters(self):
+        self._pass_done.set()
+        self._pass_done = asyncio.Event()
+
+    def _rebuild(self) -> asyncio.Task:
+        """Make sure the one catch-up rebuild is running"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._catch_up())
+            self._task.add_done_callback(self._log_failure)
+        return self._task
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Search index rebuild failed", exc_info=task.exception())
+
+    async def _ensure_current(self):
+        # Built on first use; rebuilt in the background behind newer generations
+        while self._index is None:
+            task = self._rebuild()
+            # Wait for the first pass only, not for the catch-up behind later writes
+            await self._pass_done.wait()
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        if await collection_generation_async("product") > self._generation:
+            self._rebuild()
+
+    async def current(self) -> SearchIndex:
+        await self._ensure_current()
+        return self._index
+
+    async def current_suggest(self) -> SuggestIndex:
+        await self._ensure_current()
+        return self._suggest
+
+    async def apply(self, upserted: Dict[str, dict] = None, deleted: Iterable[str] = ()):
+        """Apply this worker's admin write: {product id: Product dict} and ids
+
+        Call once after the write. If the generation moved by exactly the one
+        bump this write made, the index is now current; otherwise another write
+        happened too and a rebuild is scheduled.
+        """
+        if self._index is None:
+            return
+        upserted = upserted or {}
+        deleted = list(deleted)
+        if len(upserted) + len(deleted) > SEARCH_INCREMENTAL_LIMIT:
+            # Re-indexing a big batch in place would stall the event loop
+            self._rebuild()
+            return
+        expected = self._generation + 1
+        changed = False
+        for product_id, product in upserted.items():
+            self._index.upsert(product_id, product)
+            self._suggest.upsert(product_id, product)
+            changed = True
+        for product_id in deleted:
+            self._index.remove(product_id)
+            self._suggest.remove(product_id)
+            changed = True
+        generation = await collection_generation_async("product")
+        if changed and generation == expected:
+            self._generation = generation
+        elif generation > self._generation:
+            self._rebuild()
+
+
+catalog_search = CatalogSearch()
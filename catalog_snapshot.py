@@ -0,0 +1,154 @@
+"""
+Catalog Snapshots
+
+The product catalog only changes on admin writes, so /products (unpaginated,
+full fields) is served from a materialized snapshot: one JSON body per
+category plus one for "all", each kept as identity, gzip and (when the brotli
+package is installed) br bytes. A request costs a dict lookup and a memory
+copy regardless of catalog size.
+
+Snapshots are tagged with the product write generation. Admin writes schedule
+a rebuild after SNAPSHOT_REBUILD_DELAY, so a burst of writes shares one. A
+request that sees a newer generation (e.g. a write from another worker) waits
+for the first build that covers it instead of serving stale bytes. Only one
+rebuild runs at a time; it repeats until it has caught up with the latest
+generation, but requests are released after each pass, not at the end.
+"""
+
+import asyncio
+import gzip
+import logging
+import os
+from typing import Dict, Optional
+
+from database import collection_generation_async, get_documents_async
+from schemas import Product
+from serializers import product_list_json
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ALL = object()  # snapshot key for the unfiltered catalog; never a category value
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+SNAPSHOT_REBUILD_DELAY = float(os.getenv("SNAPSHOT_REBUILD_DELAY", "0.1"))
+
+ENCODINGS = ("br", "gzip", "identity") if brotli is not None else ("gzip", "identity")
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> str:
+    """Best encoding we have a variant for, given an Accept-Encoding header"""
+    if not accept_encoding:
+        return "identity"
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0 if encoding != "identity" else 1.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def _encode(body: bytes) -> Dict[str, bytes]:
+    variants = {"identity": body, "gzip": gzip.compress(body, GZIP_LEVEL)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return variants
+
+
+class Snapshot:
+    def __init__(self, generation: int, docs: list):
+        self.generation = generation
+        by_category = {ALL: docs}
+        for doc in docs:
+            category = doc.get("category")
+            # Uncategorized products are only listed in the full catalog
+            if category is not None:
+                by_category.setdefault(category, []).append(doc)
+        self.bodies = {key: _encode(product_list_json(group)) for key, group in by_category.items()}
+        self.empty = _encode(b"[]")
+
+    def body(self, category: Optional[str], encoding: str) -> bytes:
+        """Encoded product list for one category, or the full catalog for None"""
+        return self.bodies.get(ALL if category is None else category, self.empty)[encoding]
+
+
+class CatalogSnapshots:
+    def __init__(self):
+        self._snapshot = None
+        self._task = None
+        self._pass_done = asyncio.Event()  # set, then replaced, after every build pass
+        self._pending = None
+        self._background = set()
+
+    async def _build(self, generation: int) -> Snapshot:
+        projection = {name: 1 for name in Product.model_fields}
+        docs = await get_documents_async("product", {}, projection=projection)
+        # Serializing and compressing the whole catalog is CPU work; keep it off the loop
+        snapshot = await asyncio.to_thread(Snapshot, generation, docs)
+        if self._snapshot is None or snapshot.generation >= self._snapshot.generation:
+            self._snapshot = snapshot
+        return self._snapshot
+
+    async def _rebuild(self):
+        # Each pass builds the generation read when it starts, so writes that
+        # land during a pass cost one more pass, not one rebuild each
+        try:
+            while True:
+                generation = await collection_generation_async("product")
+                if self._snapshot is not None and self._snapshot.generation >= generation:
+                    return
+                await self._build(generation)
+                self._wake_waiters()
+        finally:
+            # Also wakes them when the rebuild fails, so they can see the error
+            self._wake_waiters()
+
+    def _wake_waiters(self):
+        self._pass_done.set()
+        self._pass_done = asyncio.Event()
+
+    async def current(self) -> Snapshot:
+        """Snapshot at least as new as the current product generation"""
+        generation = await collection_generation_async("product")
+        while self._snapshot is None or self._snapshot.generation < generation:
+            # Concurrent requests share the one running rebuild
+            if self._task is None or self._task.done():
+                self._task = asyncio.create_task(self._rebuild())
+            task = self._task
+            # Wait for the next pass only; the rebuild may keep catching up
+            # with newer writes long after this request's generation is built
+            await self._pass_done.wait()
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        return self._snapshot
+
+    async def _refresh(self):
+        await asyncio.sleep(SNAPSHOT_REBUILD_DELAY)
+        self._pending = None  # writes from here on schedule the next refresh
+        try:
+            await self.current()
+        except Exception:
+            logger.exception("Catalog snapshot rebuild failed")
+
+    def schedule_rebuild(self):
+        """Rebuild in the background after a product write; a burst of writes shares one"""
+        if self._pending is None:
+            self._pending = asyncio.create_task(self._refresh())
+            self._background.add(self._pending)
+            self._pending.add_done_callback(self._background.discard)
+
+
+catalog_snapshots = CatalogSnapshots()
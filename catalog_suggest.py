@@ -0,0 +1,126 @@
+"""
+Title Suggestions
+
+GET /products/suggest completes what a customer has typed so far from product
+titles, matching at the start of any word ("ink" suggests "Red ink bottle").
+
+Every title contributes one key per word: the normalized title from that word
+on, cut to SUGGEST_KEY_LENGTH characters, followed by the product id. Keys
+live in four sorted lists, one per rank class:
+
+    in stock, match at title start
+    in stock, match mid-title
+    out of stock, match at title start
+    out of stock, match mid-title
+
+A prefix is a contiguous range in each list, so a lookup is one bisect per
+class and then reads the first N keys. Within a class, shorter completions
+come first ("red ink" before "red ink bottle"). Keystrokes never reach Mongo,
+and their cost does not depend on the catalog size.
+"""
+
+import os
+import re
+from bisect import bisect_left, insort
+from typing import Iterable, List, Optional
+
+SUGGEST_KEY_LENGTH = int(os.getenv("SUGGEST_KEY_LENGTH", "32"))
+SUGGEST_SCAN_FACTOR = 20  # keys read per suggestion asked for, at most
+
+_WORD = re.compile(r"\w+")
+_SEPARATOR = "\x00"  # sorts before every character a key can contain
+
+
+def normalize(text: Optional[str]) -> str:
+    return " ".join(_WORD.findall(text.lower())) if text else ""
+
+
+def normalize_prefix(prefix: str) -> str:
+    normalized = normalize(prefix)
+    # A trailing space means the last word is complete: "red " must not match "reddish"
+    if normalized and prefix[-1:].isspace():
+        normalized += " "
+    return normalized[:SUGGEST_KEY_LENGTH]
+
+
+class SuggestIndex:
+    def __init__(self, docs: Iterable[dict] = ()):
+        self._classes = ([], [], [], [])
+        # product id -> (title, in_stock); enough to recompute its keys on removal
+        self._products = {}
+        for doc in docs:
+            self._add(str(doc["_id"]), doc, sort=False)
+        for keys in self._classes:
+            keys.sort()
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    @staticmethod
+    def _entries(product_id: str, title: Optional[str], in_stock: bool) -> list:
+        title = normalize(title)
+        if not title:
+            return []
+        base = 0 if in_stock else 2
+        entries = []
+        start = 0
+        while True:
+            key = title[start:start + SUGGEST_KEY_LENGTH] + _SEPARATOR + product_id
+            entries.append((base + (start > 0), key))
+            start = title.find(" ", start) + 1
+            if start == 0:
+                return entries
+
+    def _add(self, product_id: str, product: dict, sort: bool = True):
+        title, in_stock = product.get("title"), product.get("in_stock", True)
+        entries = self._entries(product_id, title, in_stock)
+        if not entries:
+            return
+        self._products[product_id] = (title, in_stock)
+        for rank_class, key in entries:
+            if sort:
+                insort(self._classes[rank_class], key)
+            else:
+                self._classes[rank_class].append(key)
+
+    def upsert(self, product_id: str, product: dict):
+        self.remove(product_id)
+        self._add(product_id, product)
+
+    def remove(self, product_id: str):
+        product = self._products.pop(product_id, None)
+        if product is None:
+            return
+        for rank_class, key in self._entries(product_id, *product):
+            keys = self._classes[rank_class]
+            del keys[bisect_left(keys, key)]
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """Up to `limit` distinct titles completing prefix, best first"""
+        normalized = normalize_prefix(prefix)
+        if not normalized:
+            return []
+        titles = []
+        seen_products = set()
+        seen_titles = set()
+        # Bounds the work when many products share a title
+        budget = limit * SUGGEST_SCAN_FACTOR
+        for keys in self._classes:
+            i = bisect_left(keys, normalized)
+            while i < len(keys) and len(titles) < limit and budget > 0:
+                key = keys[i]
+                if not key.startswith(normalized):
+                    break
+                i += 1
+                budget -= 1
+                product_id = key[key.rindex(_SEPARATOR) + 1:]
+                if product_id in seen_products:
+                    continue
+                seen_products.add(product_id)
+                title = self._products[product_id][0]
+                if title.lower() not in seen_titles:
+                    seen_titles.add(title.lower())
+                    titles.append(title)
+            if len(titles) >= limit or budget <= 0:
+                break
+        return titles
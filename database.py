@@ -3,34 +3,164 @@ Database Helper Functions
 
 MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
+
+Each helper has a sync version (pymongo) for scripts and an ``*_async`` version
+(motor) for ``async def`` routes, so request handlers never block the event loop
+on a Mongo round-trip.
 """
 
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import json_util
+from collections import OrderedDict
 from datetime import datetime, timezone
+import asyncio
+import importlib.util
+import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from typing import Union
+from typing import Optional, Union
 from pydantic import BaseModel
 
+from metrics import mongo_event_listeners
+from query_monitor import SlowQueryLogger, check_plan, check_plan_async
+
 # Load environment variables from .env file
 load_dotenv()
 
-_client = None
-db = None
+logger = logging.getLogger(__name__)
 
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
-if database_url and database_name:
-    _client = MongoClient(database_url)
-    db = _client[database_name]
+# ---------- Connection ----------
+#
+# Clients are created lazily, once per process, never at import time: a
+# pre-fork server (serve.py) must not carry sockets or monitor threads across
+# fork(). main.py connects in its lifespan and opens MONGO_WARMUP_CONNECTIONS
+# pooled connections before the worker accepts traffic. The timeouts are short
+# so a request fails fast when Mongo is down instead of waiting 30 s for server
+# selection.
 
-# Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
-    """Insert a single document with timestamp"""
-    if db is None:
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "3000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "3000"))
+MONGO_WARMUP_CONNECTIONS = int(os.getenv("MONGO_WARMUP_CONNECTIONS", "4"))
+
+def _available_compressors() -> str:
+    """zstd and/or snappy, whichever compression library is installed"""
+    available = [name for name, module in (("zstd", "zstandard"), ("snappy", "snappy"))
+                 if importlib.util.find_spec(module)]
+    return ",".join(available)
+
+# Comma-separated wire compressors in order of preference; empty disables
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", _available_compressors())
+
+_client = None
+_async_client = None
+_clients_lock = threading.Lock()
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        # Command/pool listeners feed the Prometheus metrics served on /metrics
+        # and the slow query log
+        "event_listeners": mongo_event_listeners() + [SlowQueryLogger()],
+    }
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    return options
+
+def get_client() -> Optional[MongoClient]:
+    """This process's pymongo client, or None when the database is not configured"""
+    global _client
+    if not (database_url and database_name):
+        return None
+    if _client is None:
+        with _clients_lock:
+            if _client is None:
+                _client = MongoClient(database_url, **client_options())
+    return _client
+
+def get_async_client() -> Optional[AsyncIOMotorClient]:
+    """This process's motor client, or None when the database is not configured"""
+    global _async_client
+    if not (database_url and database_name):
+        return None
+    if _async_client is None:
+        with _clients_lock:
+            if _async_client is None:
+                _async_client = AsyncIOMotorClient(database_url, **client_options())
+    return _async_client
+
+def get_db():
+    client = get_client()
+    return client[database_name] if client is not None else None
+
+def get_async_db():
+    client = get_async_client()
+    return client[database_name] if client is not None else None
+
+def __getattr__(name):
+    # ``from database import db`` keeps working for scripts; it connects lazily
+    if name == "db":
+        return get_db()
+    if name == "async_db":
+        return get_async_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def connect_async(warm_connections: int = MONGO_WARMUP_CONNECTIONS) -> bool:
+    """Create the motor client and open warm_connections pooled connections
+
+    Concurrent pings each check out their own connection, so the handshakes
+    (TCP, TLS, auth) happen here rather than on the first requests. Returns
+    False when Mongo is not configured or not reachable.
+    """
+    database = get_async_db()
+    if database is None:
+        return False
+    try:
+        await asyncio.gather(*(database.command("ping") for _ in range(max(1, warm_connections))))
+    except Exception as e:
+        logger.warning("Mongo warmup failed: %s", e)
+        return False
+    return True
+
+def close_clients():
+    """Close this process's clients; the next get_* call reconnects"""
+    global _client, _async_client
+    with _clients_lock:
+        for client in (_client, _async_client):
+            if client is not None:
+                client.close()
+        _client = _async_client = None
+
+def _forget_clients():
+    # The child must not reuse (or close) the parent's sockets and threads
+    global _client, _async_client, _clients_lock
+    _client = _async_client = None
+    _clients_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_forget_clients)
+
+def _require(database):
+    if database is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    return database
 
+def _prepare(data: Union[BaseModel, dict]) -> dict:
+    """Convert data to a dict stamped with created_at/updated_at"""
     # Convert Pydantic model to dict if needed
     if isinstance(data, BaseModel):
         data_dict = data.model_dump()
@@ -39,17 +169,381 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
 
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
+    return data_dict
+
+def _prepare_update(data: Union[BaseModel, dict]) -> dict:
+    """Build a $set update that also refreshes updated_at"""
+    if isinstance(data, BaseModel):
+        data_dict = data.model_dump()
+    else:
+        data_dict = dict(data)
+    data_dict['updated_at'] = datetime.now(timezone.utc)
+    return {"$set": data_dict}
+
+# ---------- Query cache ----------
+#
+# Opt-in (``cache=True``) result cache for collections that change only on admin
+# writes. Every write to a cached collection bumps a generation counter stored in
+# Mongo, so other workers notice within QUERY_CACHE_GENERATION_CHECK seconds;
+# entries from an older generation are never served.
+
+QUERY_CACHE_COLLECTIONS = {
+    name.strip() for name in os.getenv("QUERY_CACHE_COLLECTIONS", "product,business").split(",") if name.strip()
+}
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "60"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "256"))
+QUERY_CACHE_GENERATION_CHECK = float(os.getenv("QUERY_CACHE_GENERATION_CHECK", "1"))
+GENERATIONS_COLLECTION = "cache_generations"
+
+_cache_lock = threading.Lock()
+_query_cache = OrderedDict()  # key -> (generation, expires_at, docs)
+_generations = {}  # collection -> last known generation
+_generations_checked_at = {}  # collection -> monotonic time of last Mongo check
+
+def _cache_key(collection_name: str, filter_dict: dict, limit: int, projection: dict = None):
+    return (
+        collection_name,
+        json_util.dumps(filter_dict or {}, sort_keys=True),
+        limit or 0,
+        json_util.dumps(projection, sort_keys=True) if projection else None,
+    )
+
+def _cache_get(key, generation: int):
+    with _cache_lock:
+        entry = _query_cache.get(key)
+        if entry is None:
+            return None
+        entry_generation, expires_at, docs = entry
+        if entry_generation != generation or expires_at < time.monotonic():
+            del _query_cache[key]
+            return None
+        _query_cache.move_to_end(key)
+    # Callers mutate the returned dicts (e.g. pop "_id"), so hand out copies
+    return [dict(d) for d in docs]
+
+def _cache_put(key, generation: int, docs: list):
+    with _cache_lock:
+        _query_cache[key] = (generation, time.monotonic() + QUERY_CACHE_TTL, [dict(d) for d in docs])
+        _query_cache.move_to_end(key)
+        while len(_query_cache) > QUERY_CACHE_MAX_ENTRIES:
+            _query_cache.popitem(last=False)
+
+def clear_query_cache():
+    """Drop every cached query result in this process"""
+    with _cache_lock:
+        _query_cache.clear()
+        _generations_checked_at.clear()
+
+def _generation_is_fresh(collection_name: str) -> bool:
+    checked_at = _generations_checked_at.get(collection_name)
+    return checked_at is not None and time.monotonic() - checked_at < QUERY_CACHE_GENERATION_CHECK
+
+def _store_generation(collection_name: str, doc) -> int:
+    generation = doc.get("generation", 0) if doc else 0
+    with _cache_lock:
+        # Generations only move forward; never let a slow read roll one back
+        generation = max(generation, _generations.get(collection_name, 0))
+        _generations[collection_name] = generation
+        _generations_checked_at[collection_name] = time.monotonic()
+    return generation
+
+def collection_generation(collection_name: str) -> int:
+    """Current write generation of a cached collection"""
+    if _generation_is_fresh(collection_name):
+        return _generations[collection_name]
+    doc = _require(get_db())[GENERATIONS_COLLECTION].find_one({"_id": collection_name})
+    return _store_generation(collection_name, doc)
+
+async def collection_generation_async(collection_name: str) -> int:
+    """Current write generation of a cached collection"""
+    if _generation_is_fresh(collection_name):
+        return _generations[collection_name]
+    doc = await _require(get_async_db())[GENERATIONS_COLLECTION].find_one({"_id": collection_name})
+    return _store_generation(collection_name, doc)
+
+def bump_generation(collection_name: str):
+    """Invalidate cached reads of collection_name in every worker"""
+    if collection_name not in QUERY_CACHE_COLLECTIONS:
+        return
+    doc = _require(get_db())[GENERATIONS_COLLECTION].find_one_and_update(
+        {"_id": collection_name},
+        {"$inc": {"generation": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    _store_generation(collection_name, doc)
+
+async def bump_generation_async(collection_name: str):
+    """Invalidate cached reads of collection_name in every worker"""
+    if collection_name not in QUERY_CACHE_COLLECTIONS:
+        return
+    doc = await _require(get_async_db())[GENERATIONS_COLLECTION].find_one_and_update(
+        {"_id": collection_name},
+        {"$inc": {"generation": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    _store_generation(collection_name, doc)
+
+# Helper functions for common database operations
+def create_document(collection_name: str, data: Union[BaseModel, dict]):
+    """Insert a single document with timestamp"""
+    result = _require(get_db())[collection_name].insert_one(_prepare(data))
+    bump_generation(collection_name)
+    return str(result.inserted_id)
+
+def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, cache: bool = False, projection: dict = None):
+    """Get documents from collection, optionally through the query cache
+
+    projection is passed to find() as-is (e.g. {"title": 1, "price": 1}) so
+    Mongo only sends back the fields the caller needs.
+    """
+    cache = cache and collection_name in QUERY_CACHE_COLLECTIONS
+    if cache:
+        key = _cache_key(collection_name, filter_dict, limit, projection)
+        generation = collection_generation(collection_name)
+        cached = _cache_get(key, generation)
+        if cached is not None:
+            return cached
+
+    check_plan(_require(get_db())[collection_name], filter_dict)
+    cursor = _require(get_db())[collection_name].find(filter_dict or {}, projection)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    docs = list(cursor)
+    if cache:
+        _cache_put(key, generation, docs)
+    return docs
+
+def _page_filter(filter_dict: dict, after_id) -> dict:
+    if after_id is None:
+        return filter_dict or {}
+    if not filter_dict:
+        return {"_id": {"$gt": after_id}}
+    return {"$and": [filter_dict, {"_id": {"$gt": after_id}}]}
+
+def get_documents_page(collection_name: str, filter_dict: dict = None, limit: int = 50, after_id=None, projection: dict = None):
+    """Get one keyset page ordered by _id; returns (docs, has_more)"""
+    check_plan(_require(get_db())[collection_name], filter_dict)
+    cursor = _require(get_db())[collection_name].find(_page_filter(filter_dict, after_id), projection).sort("_id", 1).limit(limit + 1)
+    docs = list(cursor)
+    return docs[:limit], len(docs) > limit
+
+def count_documents(collection_name: str, filter_dict: dict = None):
+    """Count documents; uses collection metadata (no scan) when unfiltered"""
+    if not filter_dict:
+        return _require(get_db())[collection_name].estimated_document_count()
+    return _require(get_db())[collection_name].count_documents(filter_dict)
+
+def _first_match(pipeline: list) -> dict:
+    return pipeline[0].get("$match", {}) if pipeline and isinstance(pipeline[0], dict) else {}
+
+def aggregate(collection_name: str, pipeline: list, cache: bool = False):
+    """Run an aggregation pipeline, optionally through the query cache"""
+    cache = cache and collection_name in QUERY_CACHE_COLLECTIONS
+    if cache:
+        key = ("aggregate", collection_name, json_util.dumps(pipeline, sort_keys=True))
+        generation = collection_generation(collection_name)
+        cached = _cache_get(key, generation)
+        if cached is not None:
+            return cached
+
+    check_plan(_require(get_db())[collection_name], _first_match(pipeline))
+    docs = list(_require(get_db())[collection_name].aggregate(pipeline))
+    if cache:
+        _cache_put(key, generation, docs)
+    return docs
+
+def update_document(collection_name: str, filter_dict: dict, data: Union[BaseModel, dict]):
+    """Update the first document matching filter_dict, returns matched count"""
+    result = _require(get_db())[collection_name].update_one(filter_dict, _prepare_update(data))
+    if result.matched_count:
+        bump_generation(collection_name)
+    return result.matched_count
+
+def delete_document(collection_name: str, filter_dict: dict):
+    """Delete the first document matching filter_dict, returns deleted count"""
+    result = _require(get_db())[collection_name].delete_one(filter_dict)
+    if result.deleted_count:
+        bump_generation(collection_name)
+    return result.deleted_count
+
+# ---------- Bulk writes ----------
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+def _write_errors(exc: BulkWriteError, offset: int) -> dict:
+    """Map absolute item index -> error message from a chunk's BulkWriteError"""
+    return {offset + e["index"]: e.get("errmsg", "write error") for e in exc.details.get("writeErrors", [])}
+
+def _insert_results(docs: list, errors: dict) -> list:
+    return [
+        {"index": i, "error": errors[i]} if i in errors else {"index": i, "id": str(doc["_id"])}
+        for i, doc in enumerate(docs)
+    ]
+
+def _new_bulk_summary() -> dict:
+    return {"inserted": 0, "matched": 0, "modified": 0, "deleted": 0, "upserted": 0, "errors": {}}
 
-    result = db[collection_name].insert_one(data_dict)
+def _bulk_changed(summary: dict) -> bool:
+    return any(summary[k] for k in ("inserted", "modified", "deleted", "upserted"))
+
+def _add_bulk_counts(summary: dict, result: dict):
+    summary["inserted"] += result.get("nInserted", 0)
+    summary["matched"] += result.get("nMatched", 0)
+    summary["modified"] += result.get("nModified", 0)
+    summary["deleted"] += result.get("nRemoved", 0)
+    summary["upserted"] += result.get("nUpserted", 0)
+
+def update_operation(filter_dict: dict, data: Union[BaseModel, dict], upsert: bool = False):
+    """UpdateOne for bulk_write that $sets data and refreshes updated_at
+
+    With upsert=True, documents it inserts also get created_at.
+    """
+    update = _prepare_update(data)
+    if upsert:
+        update["$setOnInsert"] = {"created_at": update["$set"]["updated_at"]}
+    return UpdateOne(filter_dict, update, upsert=upsert)
+
+def create_documents(collection_name: str, items: list):
+    """Insert many documents with timestamps (unordered, in chunks)
+
+    Returns one {"index", "id"} or {"index", "error"} per item; a failing item
+    does not stop the others.
+    """
+    docs = [_prepare(item) for item in items]
+    collection = _require(get_db())[collection_name]
+    errors = {}
+    for offset, chunk in _chunks(docs, BULK_CHUNK_SIZE):
+        try:
+            collection.insert_many(chunk, ordered=False)
+        except BulkWriteError as e:
+            errors.update(_write_errors(e, offset))
+    if len(errors) < len(docs):
+        bump_generation(collection_name)
+    return _insert_results(docs, errors)
+
+def bulk_write(collection_name: str, operations: list):
+    """Run pymongo write operations (UpdateOne, DeleteOne, ...) unordered, in chunks
+
+    Returns summed counts plus "errors": {operation index: message}.
+    """
+    collection = _require(get_db())[collection_name]
+    summary = _new_bulk_summary()
+    for offset, chunk in _chunks(operations, BULK_CHUNK_SIZE):
+        try:
+            _add_bulk_counts(summary, collection.bulk_write(chunk, ordered=False).bulk_api_result)
+        except BulkWriteError as e:
+            _add_bulk_counts(summary, e.details)
+            summary["errors"].update(_write_errors(e, offset))
+    if _bulk_changed(summary):
+        bump_generation(collection_name)
+    return summary
+
+# Async helpers (motor) for use inside async routes
+async def create_document_async(collection_name: str, data: Union[BaseModel, dict]):
+    """Insert a single document with timestamp"""
+    result = await _require(get_async_db())[collection_name].insert_one(_prepare(data))
+    await bump_generation_async(collection_name)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
-    if db is None:
-        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
-    
-    cursor = db[collection_name].find(filter_dict or {})
+async def get_documents_async(collection_name: str, filter_dict: dict = None, limit: int = None, cache: bool = False, projection: dict = None):
+    """Get documents from collection, optionally through the query cache"""
+    cache = cache and collection_name in QUERY_CACHE_COLLECTIONS
+    if cache:
+        key = _cache_key(collection_name, filter_dict, limit, projection)
+        generation = await collection_generation_async(collection_name)
+        cached = _cache_get(key, generation)
+        if cached is not None:
+            return cached
+
+    await check_plan_async(_require(get_async_db())[collection_name], filter_dict)
+    cursor = _require(get_async_db())[collection_name].find(filter_dict or {}, projection)
     if limit:
         cursor = cursor.limit(limit)
-    
-    return list(cursor)
+
+    docs = await cursor.to_list(length=None)
+    if cache:
+        _cache_put(key, generation, docs)
+    return docs
+
+async def get_documents_page_async(collection_name: str, filter_dict: dict = None, limit: int = 50, after_id=None, projection: dict = None):
+    """Get one keyset page ordered by _id; returns (docs, has_more)"""
+    await check_plan_async(_require(get_async_db())[collection_name], filter_dict)
+    cursor = _require(get_async_db())[collection_name].find(_page_filter(filter_dict, after_id), projection).sort("_id", 1).limit(limit + 1)
+    docs = await cursor.to_list(length=None)
+    return docs[:limit], len(docs) > limit
+
+async def count_documents_async(collection_name: str, filter_dict: dict = None):
+    """Count documents; uses collection metadata (no scan) when unfiltered"""
+    if not filter_dict:
+        return await _require(get_async_db())[collection_name].estimated_document_count()
+    return await _require(get_async_db())[collection_name].count_documents(filter_dict)
+
+async def aggregate_async(collection_name: str, pipeline: list, cache: bool = False):
+    """Run an aggregation pipeline, optionally through the query cache"""
+    cache = cache and collection_name in QUERY_CACHE_COLLECTIONS
+    if cache:
+        key = ("aggregate", collection_name, json_util.dumps(pipeline, sort_keys=True))
+        generation = await collection_generation_async(collection_name)
+        cached = _cache_get(key, generation)
+        if cached is not None:
+            return cached
+
+    await check_plan_async(_require(get_async_db())[collection_name], _first_match(pipeline))
+    docs = await _require(get_async_db())[collection_name].aggregate(pipeline).to_list(length=None)
+    if cache:
+        _cache_put(key, generation, docs)
+    return docs
+
+async def find_one_async(collection_name: str, filter_dict: dict = None):
+    """Get the first document matching filter_dict, or None"""
+    return await _require(get_async_db())[collection_name].find_one(filter_dict or {})
+
+async def update_document_async(collection_name: str, filter_dict: dict, data: Union[BaseModel, dict]):
+    """Update the first document matching filter_dict, returns matched count"""
+    result = await _require(get_async_db())[collection_name].update_one(filter_dict, _prepare_update(data))
+    if result.matched_count:
+        await bump_generation_async(collection_name)
+    return result.matched_count
+
+async def delete_document_async(collection_name: str, filter_dict: dict):
+    """Delete the first document matching filter_dict, returns deleted count"""
+    result = await _require(get_async_db())[collection_name].delete_one(filter_dict)
+    if result.deleted_count:
+        await bump_generation_async(collection_name)
+    return result.deleted_count
+
+async def create_documents_async(collection_name: str, items: list):
+    """Insert many documents with timestamps (unordered, in chunks)"""
+    docs = [_prepare(item) for item in items]
+    collection = _require(get_async_db())[collection_name]
+    errors = {}
+    for offset, chunk in _chunks(docs, BULK_CHUNK_SIZE):
+        try:
+            await collection.insert_many(chunk, ordered=False)
+        except BulkWriteError as e:
+            errors.update(_write_errors(e, offset))
+    if len(errors) < len(docs):
+        await bump_generation_async(collection_name)
+    return _insert_results(docs, errors)
+
+async def bulk_write_async(collection_name: str, operations: list):
+    """Run pymongo write operations (UpdateOne, DeleteOne, ...) unordered, in chunks"""
+    collection = _require(get_async_db())[collection_name]
+    summary = _new_bulk_summary()
+    for offset, chunk in _chunks(operations, BULK_CHUNK_SIZE):
+        try:
+            result = await collection.bulk_write(chunk, ordered=False)
+            _add_bulk_counts(summary, result.bulk_api_result)
+        except BulkWriteError as e:
+            _add_bulk_counts(summary, e.details)
+            summary["errors"].update(_write_errors(e, offset))
+    if _bulk_changed(summary):
+        await bump_generation_async(collection_name)
+    return summary
@@ -0,0 +1,176 @@
+"""
+Email Outbox
+
+Order intake writes one ``email_outbox`` document per order email instead of
+sending it from the web worker. A separate worker process drains the outbox
+in batches, with retries, exponential backoff and a send rate limit:
+
+    python email_outbox.py            # run forever
+    python email_outbox.py --once     # drain what is due and exit
+
+Documents move pending -> sending -> sent, or back to pending with a later
+next_attempt_at after a failure, or to failed after EMAIL_MAX_ATTEMPTS. A
+"sending" claim expires after EMAIL_LEASE_SECONDS, so a crashed worker never
+strands an email.
+
+Set EMAIL_METRICS_PORT to serve the worker's Prometheus metrics (email send
+outcomes and durations) on that port.
+"""
+
+import argparse
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+
+from schemas import Business, InkOrder
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_COLLECTION = "email_outbox"
+
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "8"))
+EMAIL_BACKOFF_BASE = float(os.getenv("EMAIL_BACKOFF_BASE", "30"))
+EMAIL_BACKOFF_MAX = float(os.getenv("EMAIL_BACKOFF_MAX", "3600"))
+EMAIL_RATE_PER_SECOND = float(os.getenv("EMAIL_RATE_PER_SECOND", "5"))
+EMAIL_LEASE_SECONDS = float(os.getenv("EMAIL_LEASE_SECONDS", "300"))
+EMAIL_POLL_INTERVAL = float(os.getenv("EMAIL_POLL_INTERVAL", "2"))
+EMAIL_METRICS_PORT = os.getenv("EMAIL_METRICS_PORT")
+
+
+def new_order_email(order: InkOrder, business: Business) -> dict:
+    """Outbox document for one order notification, ready for create_document"""
+    return {
+        "kind": "order",
+        "to": business.email,
+        "order": order.model_dump(),
+        "business": business.model_dump(),
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": datetime.now(timezone.utc),
+        "last_error": None,
+    }
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before retry number `attempts`, with +/-20% jitter"""
+    delay = min(EMAIL_BACKOFF_MAX, EMAIL_BACKOFF_BASE * (2 ** (attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim(outbox):
+    """Atomically claim the next due email, or None"""
+    now = datetime.now(timezone.utc)
+    return outbox.find_one_and_update(
+        {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "sending", "lease_until": {"$lt": now}},
+        ]},
+        {"$set": {"status": "sending", "lease_until": now + timedelta(seconds=EMAIL_LEASE_SECONDS)}},
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _send(doc: dict):
+    # Imported here so the web app can enqueue without loading the SMTP pool
+    from mailer import send_order_email
+
+    send_order_email(InkOrder(**doc["order"]), Business(**doc["business"]))
+
+
+def deliver(outbox, doc: dict) -> bool:
+    """Send one claimed email and record the outcome"""
+    try:
+        _send(doc)
+    except Exception as e:
+        attempts = doc.get("attempts", 0) + 1
+        now = datetime.now(timezone.utc)
+        update = {"attempts": attempts, "last_error": str(e)[:500], "updated_at": now}
+        if attempts >= EMAIL_MAX_ATTEMPTS:
+            update["status"] = "failed"
+            logger.error("Giving up on outbox email %s after %d attempts: %s", doc["_id"], attempts, e)
+        else:
+            update["status"] = "pending"
+            update["next_attempt_at"] = now + timedelta(seconds=backoff_seconds(attempts))
+            logger.warning("Outbox email %s failed (attempt %d): %s", doc["_id"], attempts, e)
+        outbox.update_one({"_id": doc["_id"]}, {"$set": update, "$unset": {"lease_until": ""}})
+        return False
+
+    now = datetime.now(timezone.utc)
+    outbox.update_one(
+        {"_id": doc["_id"]},
+        {"$set": {"status": "sent", "sent_at": now, "updated_at": now}, "$unset": {"lease_until": ""}},
+    )
+    return True
+
+
+def drain_batch(outbox, batch_size: int = EMAIL_BATCH_SIZE, rate: float = EMAIL_RATE_PER_SECOND) -> int:
+    """Claim and send up to batch_size due emails, returns how many were claimed"""
+    interval = 1 / rate if rate > 0 else 0
+    claimed = 0
+    next_send = time.monotonic()
+    while claimed < batch_size:
+        doc = claim(outbox)
+        if doc is None:
+            break
+        claimed += 1
+        # Simple rate limit: space sends at least `interval` apart
+        delay = next_send - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        next_send = time.monotonic() + interval
+        deliver(outbox, doc)
+    return claimed
+
+
+async def backlog_async(outbox) -> dict:
+    """Due and failed email counts, and how long the oldest due email has waited"""
+    now = datetime.now(timezone.utc)
+    due_filter = {"status": "pending", "next_attempt_at": {"$lte": now}}
+    due = await outbox.count_documents(due_filter)
+    failed = await outbox.count_documents({"status": "failed"})
+    oldest = await outbox.find_one(due_filter, {"next_attempt_at": 1}, sort=[("next_attempt_at", 1)])
+    oldest_due_seconds = 0.0
+    if oldest is not None:
+        due_at = oldest["next_attempt_at"]
+        if due_at.tzinfo is None:  # pymongo returns naive UTC datetimes
+            due_at = due_at.replace(tzinfo=timezone.utc)
+        oldest_due_seconds = round((now - due_at).total_seconds(), 1)
+    return {"due": due, "failed": failed, "oldest_due_seconds": oldest_due_seconds}
+
+
+def run_worker(database, once: bool = False):
+    outbox = database[OUTBOX_COLLECTION]
+    logger.info("Email outbox worker started")
+    while True:
+        claimed = drain_batch(outbox)
+        if once and claimed == 0:
+            return
+        if claimed == 0:
+            time.sleep(EMAIL_POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    from database import get_db
+
+    parser = argparse.ArgumentParser(description="Send queued order emails from the email_outbox collection")
+    parser.add_argument("--once", action="store_true", help="Exit once no email is due")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    db = get_db()
+    if db is None:
+        raise SystemExit("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    if EMAIL_METRICS_PORT:
+        from prometheus_client import start_http_server
+
+        start_http_server(int(EMAIL_METRICS_PORT))
+    try:
+        run_worker(db, once=args.once)
+    except KeyboardInterrupt:
+        pass
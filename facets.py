@@ -0,0 +1,83 @@
+"""
+Catalog Facets
+
+/products?facets=true returns facet counts next to the page of products: the
+total, products per category, in-stock vs out-of-stock, and products per price
+bucket. All of them come from one ``$facet`` aggregation, which goes through
+the query cache. That caches the counts per filter combination until the next
+product write moves the write generation.
+
+The category facet ignores the request's own category filter. A browse page
+with ?category=ink still shows how many products the other categories have,
+so customers can widen a multi-select. Every other count applies every filter.
+"""
+
+import os
+from typing import List, Optional
+
+from database import aggregate_async
+
+# Lower bounds of the price buckets; the last bucket is open-ended
+PRICE_BUCKETS = [float(b) for b in os.getenv("FACET_PRICE_BUCKETS", "0,100,500,1000,5000").split(",")]
+
+_OTHER = "other"  # $bucket id for missing or non-numeric prices
+
+
+def product_filter(categories: List[str] = None, min_price: Optional[float] = None,
+                   max_price: Optional[float] = None, in_stock: Optional[bool] = None) -> dict:
+    """Mongo filter for the /products query parameters"""
+    filter_dict = {}
+    if categories:
+        filter_dict["category"] = categories[0] if len(categories) == 1 else {"$in": list(categories)}
+    price = {}
+    if min_price is not None:
+        price["$gte"] = min_price
+    if max_price is not None:
+        price["$lte"] = max_price
+    if price:
+        filter_dict["price"] = price
+    if in_stock is not None:
+        filter_dict["in_stock"] = in_stock
+    return filter_dict
+
+
+def facet_pipeline(filter_dict: dict) -> list:
+    shared = {k: v for k, v in filter_dict.items() if k != "category"}
+    narrowed = [{"$match": {"category": filter_dict["category"]}}] if "category" in filter_dict else []
+    return [
+        {"$match": shared},
+        {"$facet": {
+            # Like $sortByCount, with ties in a stable order
+            "categories": [
+                {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+            ],
+            "in_stock": narrowed + [{"$group": {"_id": "$in_stock", "count": {"$sum": 1}}}],
+            "price": narrowed + [{"$bucket": {
+                "groupBy": "$price",
+                "boundaries": PRICE_BUCKETS + [float("inf")],
+                "default": _OTHER,
+                "output": {"count": {"$sum": 1}},
+            }}],
+            "total": narrowed + [{"$count": "count"}],
+        }},
+    ]
+
+
+def _shape(result: dict) -> dict:
+    buckets = {b["_id"]: b["count"] for b in result.get("price", [])}
+    bounds = list(zip(PRICE_BUCKETS, PRICE_BUCKETS[1:] + [None]))
+    stock = {s["_id"]: s["count"] for s in result.get("in_stock", [])}
+    total = result.get("total") or [{"count": 0}]
+    return {
+        "total": total[0]["count"],
+        "categories": [{"value": c["_id"], "count": c["count"]} for c in result.get("categories", []) if c["_id"] is not None],
+        "in_stock": [{"value": "true", "count": stock.get(True, 0)}, {"value": "false", "count": stock.get(False, 0)}],
+        "price": [{"min": low, "max": high, "count": buckets.get(low, 0)} for low, high in bounds],
+    }
+
+
+async def product_facets(filter_dict: dict) -> dict:
+    """Facet counts for filter_dict, cached until the next product write"""
+    results = await aggregate_async("product", facet_pipeline(filter_dict), cache=True)
+    return _shape(results[0] if results else {})
@@ -0,0 +1,73 @@
+"""
+Group Commit
+
+Collects concurrent inserts into one collection for a short, bounded window
+(``max_delay_ms`` or ``max_batch`` documents, whichever comes first) and writes
+them with a single unordered ``insert_many``. Every caller still awaits its
+own inserted id, or its own error if that document was rejected.
+"""
+
+import asyncio
+import logging
+from typing import Union
+
+from pydantic import BaseModel
+
+from database import create_documents_async
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitter:
+    def __init__(self, collection_name: str, max_delay_ms: float = 5, max_batch: int = 100):
+        self.collection_name = collection_name
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch = max_batch
+        self._pending = []  # (data, future)
+        self._timer = None
+        self._writes = set()
+
+    async def insert(self, data: Union[BaseModel, dict]) -> str:
+        """Queue data for the next group write and wait for its inserted id"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((data, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._write(batch))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch: list):
+        try:
+            results = await create_documents_async(self.collection_name, [data for data, _ in batch])
+        except Exception as e:
+            logger.exception("Group insert of %d documents into %s failed", len(batch), self.collection_name)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if "error" in result:
+                future.set_exception(RuntimeError(result["error"]))
+            else:
+                future.set_result(result["id"])
+
+    async def close(self):
+        """Write anything still queued and wait for in-flight writes"""
+        self._flush()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
@@ -0,0 +1,70 @@
+"""
+Health Probes
+
+GET /healthz is liveness: it answers from memory, so it only proves the worker's
+event loop is serving. GET /readyz is readiness: it pings Mongo and reads the
+email outbox backlog at most once per READINESS_CACHE_SECONDS per worker, and
+probes in between get the cached result. However often the orchestrator
+probes, each worker sends the database a handful of cheap commands per interval.
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from database import MONGO_MAX_POOL_SIZE, get_async_db
+from email_outbox import OUTBOX_COLLECTION, backlog_async
+from metrics import pool_stats
+
+logger = logging.getLogger(__name__)
+
+READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", "5"))
+
+
+class Readiness:
+    def __init__(self, ttl: float = READINESS_CACHE_SECONDS):
+        self.ttl = ttl
+        self._result = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._result is not None and time.monotonic() - self._checked_at < self.ttl
+
+    async def _probe(self) -> dict:
+        database = get_async_db()
+        if database is None:
+            return {"ready": False, "mongo": {"status": "not_configured"}, "email_outbox": None}
+
+        start = time.perf_counter()
+        try:
+            await database.command("ping")
+        except Exception as e:
+            return {"ready": False, "mongo": {"status": "error", "error": str(e)[:200]}, "email_outbox": None}
+        mongo = {"status": "ok", "ping_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+        # Reported only: web workers do not send email, so a backlog never
+        # makes them unready
+        try:
+            backlog = await backlog_async(database[OUTBOX_COLLECTION])
+        except Exception as e:
+            logger.warning("Email outbox backlog check failed: %s", e)
+            backlog = None
+        return {"ready": True, "mongo": mongo, "email_outbox": backlog}
+
+    async def check(self) -> dict:
+        """Cached probe result plus live pool stats"""
+        if not self._fresh():
+            # One probe per interval, however many requests are waiting
+            async with self._lock:
+                if not self._fresh():
+                    self._result = await self._probe()
+                    self._checked_at = time.monotonic()
+        result = dict(self._result)
+        result["checked_seconds_ago"] = round(time.monotonic() - self._checked_at, 2)
+        result["pool"] = dict(pool_stats(), max_size=MONGO_MAX_POOL_SIZE)
+        return result
+
+
+readiness = Readiness()
@@ -0,0 +1,89 @@
+"""
+Index Reconciliation
+
+Creates the indexes declared in schemas.INDEXES that are missing and reports
+indexes that exist but are not declared, or have not been used since the
+server started (via $indexStats). serve.py runs this once per start from its
+master process; a single-process server (uvicorn) runs it in the background at
+startup. It can also be run ahead of a deploy:
+
+    python indexes.py             # create missing indexes, print a JSON report
+    python indexes.py --dry-run   # only report
+"""
+
+import argparse
+import json
+import logging
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from schemas import INDEXES
+
+logger = logging.getLogger(__name__)
+
+
+def _index_usage(collection) -> dict:
+    """Map index name -> ops since the mongod started, empty if unsupported"""
+    try:
+        return {s["name"]: s["accesses"]["ops"] for s in collection.aggregate([{"$indexStats": {}}])}
+    except (OperationFailure, KeyError):
+        return {}
+
+
+def reconcile_indexes(database, dry_run: bool = False) -> dict:
+    """Create missing declared indexes and report extra/unused ones"""
+    report = {}
+    for collection_name, specs in INDEXES.items():
+        collection = database[collection_name]
+        entry = {"created": [], "missing": [], "extra": [], "unused": [], "errors": []}
+        existing = collection.index_information()
+        declared = set()
+        for keys, options in specs:
+            name = options["name"]
+            declared.add(name)
+            if name in existing:
+                continue
+            if dry_run:
+                entry["missing"].append(name)
+                continue
+            try:
+                collection.create_index(keys, background=True, **options)
+                entry["created"].append(name)
+            except PyMongoError as e:
+                entry["errors"].append(f"{name}: {e}")
+
+        entry["extra"] = sorted(name for name in existing if name != "_id_" and name not in declared)
+        usage = _index_usage(collection)
+        entry["unused"] = sorted(name for name, ops in usage.items() if ops == 0 and name != "_id_")
+        report[collection_name] = entry
+    return report
+
+
+def log_report(report: dict):
+    for collection_name, entry in report.items():
+        for name in entry["created"]:
+            logger.info("Created index %s.%s", collection_name, name)
+        for name in entry["missing"]:
+            logger.warning("Missing index %s.%s", collection_name, name)
+        for name in entry["extra"]:
+            logger.warning("Undeclared index %s.%s", collection_name, name)
+        for name in entry["unused"]:
+            logger.info("Unused index %s.%s (no ops since mongod start)", collection_name, name)
+        for error in entry["errors"]:
+            logger.error("Index creation failed on %s: %s", collection_name, error)
+
+
+if __name__ == "__main__":
+    from database import get_db
+
+    parser = argparse.ArgumentParser(description="Reconcile MongoDB indexes with schemas.INDEXES")
+    parser.add_argument("--dry-run", action="store_true", help="Report only, do not create indexes")
+    args = parser.parse_args()
+
+    db = get_db()
+    if db is None:
+        raise SystemExit("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    result = reconcile_indexes(db, dry_run=args.dry_run)
+    print(json.dumps(result, indent=2))
+    if any(entry["errors"] for entry in result.values()):
+        raise SystemExit(1)
@@ -0,0 +1,182 @@
+"""
+Order Email Sending
+
+Order emails go through a small pool of long-lived SMTP sessions. Each session
+pays the connect + STARTTLS + login handshake once and is then reused. Idle
+sessions are health-checked with NOOP before reuse and replaced when the
+server has dropped them.
+"""
+
+import os
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+from typing import Tuple
+
+from metrics import EMAIL_SEND_SECONDS, EMAIL_SENT
+from schemas import Business, InkOrder
+
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_POOL_MAX_IDLE = float(os.getenv("SMTP_POOL_MAX_IDLE", "60"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+
+# Errors meaning the connection itself is gone. A send that hits one on a reused
+# session is retried once on a fresh connection; SMTP replies (auth failures,
+# refused recipients, 5xx on DATA) and timeouts are never retried, since the
+# server may already have accepted the message
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+
+class SMTPPool:
+    def __init__(self, host: str, port: int, user: str = None, password: str = None, use_tls: bool = True,
+                 size: int = SMTP_POOL_SIZE, max_idle: float = SMTP_POOL_MAX_IDLE, timeout: float = SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()  # (server, last_used)
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            self._discard(server)
+            raise
+        return server
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _is_healthy(self, server: smtplib.SMTP, last_used: float) -> bool:
+        if time.monotonic() - last_used > self.max_idle:
+            return False
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _checkout(self) -> Tuple[smtplib.SMTP, bool]:
+        """(session, whether it was reused from the pool)"""
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect(), False
+            if self._is_healthy(server, last_used):
+                return server, True
+            self._discard(server)
+
+    @contextmanager
+    def connection(self):
+        """Borrow an authenticated session as (server, reused); it is dropped if anything fails"""
+        self._slots.acquire()
+        try:
+            server, reused = self._checkout()
+            try:
+                yield server, reused
+            except Exception:
+                self._discard(server)
+                raise
+            self._idle.put((server, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def send_message(self, msg: EmailMessage):
+        try:
+            with self.connection() as (server, reused):
+                server.send_message(msg)
+        except _CONNECTION_ERRORS:
+            # Only a pooled session the server closed after its NOOP check is
+            # worth a retry; a fresh connection failing would fail again
+            if not reused:
+                raise
+            with self.connection() as (server, _):
+                server.send_message(msg)
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(server)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> SMTPPool:
+    """Process-wide pool built from the SMTP_* env vars"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPPool(
+                os.getenv("SMTP_HOST"),
+                int(os.getenv("SMTP_PORT", "587")),
+                os.getenv("SMTP_USER"),
+                os.getenv("SMTP_PASSWORD"),
+                os.getenv("SMTP_TLS", "true").lower() in ("1", "true", "yes"),
+            )
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def build_order_email(order: InkOrder, business: Business) -> EmailMessage:
+    smtp_user = os.getenv("SMTP_USER")
+
+    msg = EmailMessage()
+    msg["Subject"] = f"New Ink Order: {order.color} - {order.quantity_liters} L"
+    msg["From"] = smtp_user if smtp_user else business.email
+    msg["To"] = business.email
+
+    body = (
+        f"New Ink Order Received\n\n"
+        f"Customer: {order.customer_name}\n"
+        f"Email: {order.customer_email}\n"
+        f"Phone: {order.customer_phone or '-'}\n\n"
+        f"Color: {order.color}\n"
+        f"Quantity (L): {order.quantity_liters}\n"
+        f"Delivery Address: {order.delivery_address or '-'}\n\n"
+        f"Message:\n{order.message or '-'}\n"
+    )
+    msg.set_content(body)
+    return msg
+
+
+def send_order_email(order: InkOrder, business: Business):
+    if not os.getenv("SMTP_HOST") or not business.email:
+        EMAIL_SENT.labels("not_configured").inc()
+        raise RuntimeError("Email is not configured. Set SMTP_* env vars and business email.")
+
+    start = time.perf_counter()
+    try:
+        get_pool().send_message(build_order_email(order, business))
+    except Exception:
+        EMAIL_SENT.labels("error").inc()
+        raise
+    finally:
+        EMAIL_SEND_SECONDS.observe(time.perf_counter() - start)
+    EMAIL_SENT.labels("sent").inc()
@@ -1,17 +1,74 @@
+import asyncio
+import hashlib
+import io
+import logging
 import os
-from typing import List, Optional
-from fastapi import FastAPI, HTTPException, Header, BackgroundTasks
+from contextlib import asynccontextmanager
+from typing import List, Optional, Union
+from fastapi import FastAPI, HTTPException, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from bson.objectid import ObjectId
-from email.message import EmailMessage
-import smtplib
+from pymongo import DeleteOne
 
-from database import db, create_document, get_documents
-from schemas import Product, Business, InkOrder
+from database import (
+    get_db,
+    get_async_db,
+    connect_async,
+    close_clients,
+    create_document_async,
+    get_documents_async,
+    get_documents_page_async,
+    count_documents_async,
+    find_one_async,
+    update_document_async,
+    delete_document_async,
+    create_documents_async,
+    bulk_write_async,
+    update_operation,
+    collection_generation_async,
+)
+from schemas import Product, ProductPage, Business, InkOrder
+from business_cache import business_cache
+from codec import FastJSONResponse, FastJSONRoute
+from serializers import json_bytes, product_list_json, product_page_json
+from catalog_snapshot import catalog_snapshots, choose_encoding
+from catalog_search import catalog_search
+from facets import product_filter, product_facets
+from product_import import AsyncStreamReader, check_options, guess_format, import_products
+from metrics import MetricsMiddleware, render_latest
+from admission import AdmissionMiddleware
+from health import readiness
+from warmup import warmup_hook, run_warmup
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, next_cursor
+from indexes import reconcile_indexes, log_report
+from group_commit import GroupCommitter
+from email_outbox import OUTBOX_COLLECTION, new_order_email
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in each worker after the fork: connect, warm caches, then serve
+    await run_warmup()
+    if ENSURE_INDEXES_ON_STARTUP and get_db() is not None:
+        # Runs in the background so index builds never delay startup
+        app.state.index_task = asyncio.create_task(_ensure_indexes())
+    try:
+        yield
+    finally:
+        if order_committer is not None:
+            await order_committer.close()
+            await outbox_committer.close()
+        close_clients()
 
-app = FastAPI(title="Laxmi Enterprise API")
+app = FastAPI(title="Laxmi Enterprise API", default_response_class=FastJSONResponse, lifespan=lifespan)
+# Parse request bodies with the same codec; must be set before routes are added
+app.router.route_class = FastJSONRoute
 
+# Middleware added first runs innermost: admission control sits inside CORS so
+# 503s still carry CORS headers, and preflight requests are never queued
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -19,26 +76,129 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # ---------- Utilities ----------
 
-def _collection(name: str):
-    return db[name]
-
 ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "changeme")
 
 async def verify_admin(x_admin_token: Optional[str]):
     if not x_admin_token or x_admin_token != ADMIN_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
+async def _etag(request: Request, collection_name: str, encoding: str = "identity") -> str:
+    """Strong ETag from the collection's write generation and the query string
+
+    The generation only moves when the collection is written, so computing the
+    tag needs no query (beyond the throttled generation check). Compressed
+    variants get their own tag, as strong ETags must differ per encoding.
+    """
+    generation = await collection_generation_async(collection_name)
+    variant = hashlib.blake2b(request.url.query.encode(), digest_size=8).hexdigest()
+    if encoding != "identity":
+        variant = f"{variant}-{encoding}"
+    return f'"{collection_name}-{generation}-{variant}"'
+
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    """304 response when If-None-Match matches etag, else None"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    tags = [t.strip() for t in if_none_match.split(",")]
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return None
+
+async def _catalog_changed(upserted: Optional[dict] = None, deleted: List[str] = ()):
+    """Call after any admin product write, with the products it wrote"""
+    catalog_snapshots.schedule_rebuild()
+    await catalog_search.apply(upserted, deleted)
+
+def _parse_fields(fields: Optional[str]) -> Optional[dict]:
+    """Turn ?fields=title,price into a Mongo projection, validated against Product"""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in Product.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return {name: 1 for name in names}
+
+async def _fetch_page(collection: str, filt: dict, limit: Optional[int], cursor: Optional[str], include_total: bool, projection: Optional[dict] = None):
+    """Fetch one keyset page, returns (docs, next_cursor, total)"""
+    after_id = None
+    if cursor:
+        try:
+            after_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    docs, has_more = await get_documents_page_async(collection, filt, limit or DEFAULT_PAGE_SIZE, after_id, projection)
+    total = await count_documents_async(collection, filt) if include_total else None
+    return docs, next_cursor(docs, has_more), total
+
+ENSURE_INDEXES_ON_STARTUP = os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+async def _ensure_indexes():
+    try:
+        log_report(await asyncio.to_thread(reconcile_indexes, get_db()))
+    except Exception:
+        logger.exception("Index reconciliation failed")
+
+# Optional group commit for order intake: concurrent orders are written with one
+# insert_many per ORDER_GROUP_COMMIT_WINDOW_MS window (or MAX_BATCH orders)
+ORDER_GROUP_COMMIT = os.getenv("ORDER_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+ORDER_GROUP_COMMIT_WINDOW_MS = float(os.getenv("ORDER_GROUP_COMMIT_WINDOW_MS", "5"))
+ORDER_GROUP_COMMIT_MAX_BATCH = int(os.getenv("ORDER_GROUP_COMMIT_MAX_BATCH", "100"))
+order_committer = outbox_committer = None
+if ORDER_GROUP_COMMIT:
+    order_committer = GroupCommitter("inkorder", ORDER_GROUP_COMMIT_WINDOW_MS, ORDER_GROUP_COMMIT_MAX_BATCH)
+    outbox_committer = GroupCommitter(OUTBOX_COLLECTION, ORDER_GROUP_COMMIT_WINDOW_MS, ORDER_GROUP_COMMIT_MAX_BATCH)
+
+@warmup_hook
+async def connect_database():
+    app.state.mongo_connected = await connect_async()
+
+# When Mongo is unreachable at startup the worker still boots; these caches
+# then load on their first request instead
+
+@warmup_hook
+async def load_business_cache():
+    if app.state.mongo_connected:
+        await business_cache.load()
+
+@warmup_hook
+async def build_catalog_snapshot():
+    if app.state.mongo_connected:
+        await catalog_snapshots.current()
+
+@warmup_hook
+async def build_search_index():
+    if app.state.mongo_connected:
+        await catalog_search.current()
+
 # ---------- Public Endpoints ----------
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Laxmi Enterprise Backend running"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_latest()
+    return Response(body, media_type=content_type)
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    # Liveness only: no I/O, so a slow database never gets the worker restarted
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    result = await readiness.check()
+    return FastJSONResponse(result, status_code=200 if result["ready"] else 503)
+
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -48,13 +208,14 @@ def test_database():
         "collections": []
     }
     try:
-        if db is not None:
+        async_db = get_async_db()
+        if async_db is not None:
             response["database"] = "✅ Available"
             response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-            response["database_name"] = db.name
+            response["database_name"] = async_db.name
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                collections = await async_db.list_collection_names()
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
@@ -63,78 +224,115 @@ def test_database():
         response["database"] = f"❌ Error: {str(e)[:80]}"
     return response
 
-@app.get("/products", response_model=List[Product])
-def list_products(category: Optional[str] = None):
-    filt = {"category": category} if category else {}
-    docs = get_documents("product", filt)
-    # Convert to Product-friendly dicts (remove _id)
-    out = []
-    for d in docs:
-        d.pop("_id", None)
-        out.append(Product(**d))
-    return out
+@app.get("/products", response_model=Union[ProductPage, List[Product]])
+async def list_products(
+    request: Request,
+    category: Optional[List[str]] = Query(None, description="Repeat to match any of several categories"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: Optional[bool] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    facets: bool = Query(False, description="Include facet counts (returns a page)"),
+    fields: Optional[str] = Query(None, description="Comma-separated Product fields to return"),
+):
+    projection = _parse_fields(fields)
+    filt = product_filter(category, min_price, max_price, in_stock)
+    paginated = limit is not None or cursor is not None or facets
+    # Full, unpaginated listings of one category (or all) come from the
+    # pre-encoded catalog snapshot
+    from_snapshot = not paginated and not projection and set(filt) <= {"category"} and len(category or []) <= 1
+    encoding = choose_encoding(request.headers.get("accept-encoding")) if from_snapshot else "identity"
+
+    etag = await _etag(request, "product", encoding)
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if from_snapshot:
+        snapshot = await catalog_snapshots.current()
+        headers["Vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        body = snapshot.body(category[0] if category else None, encoding)
+        return Response(body, media_type="application/json", headers=headers)
+
+    facet_counts = None
+    if facets:
+        # The facet total stands in for include_total; both queries run concurrently
+        (docs, cursor_out, _), facet_counts = await asyncio.gather(
+            _fetch_page("product", filt, limit, cursor, False, projection),
+            product_facets(filt),
+        )
+        total = facet_counts["total"] if include_total else None
+    elif paginated:
+        docs, cursor_out, total = await _fetch_page("product", filt, limit, cursor, include_total, projection)
+    else:
+        docs = await get_documents_async("product", filt, cache=True, projection=projection)
+
+    # Documents were validated on write; encode them directly instead of
+    # rebuilding Product models and re-validating against response_model
+    if projection:
+        # Sparse fieldsets are partial products
+        for d in docs:
+            d.pop("_id", None)
+        content = {"items": docs, "next_cursor": cursor_out, "total": total} if paginated else docs
+        if facet_counts is not None:
+            content["facets"] = facet_counts
+        body = json_bytes(content)
+    elif paginated:
+        body = product_page_json(docs, cursor_out, total, facet_counts)
+    else:
+        body = product_list_json(docs)
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/products/search", response_model=List[Product])
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to look for in title, category and description"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    # Ranked in process from the search index; no Mongo round-trip
+    index = await catalog_search.current()
+    return Response(index.search_json(q, limit), media_type="application/json")
+
+@app.get("/products/suggest", response_model=List[str])
+async def suggest_products(
+    prefix: str = Query(..., min_length=1, max_length=100, description="What the customer has typed so far"),
+    limit: int = Query(10, ge=1, le=25),
+):
+    # Per-keystroke typeahead, answered from memory
+    suggest = await catalog_search.current_suggest()
+    return Response(json_bytes(suggest.suggest(prefix, limit)), media_type="application/json")
 
 @app.get("/business", response_model=Optional[Business])
-def get_business_details():
-    docs = get_documents("business", {})
-    if not docs:
-        return None
-    d = docs[0]
-    d.pop("_id", None)
-    return Business(**d)
-
-# ---------- Email Sending ----------
-
-def send_order_email(order: InkOrder, business: Business):
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_pass = os.getenv("SMTP_PASSWORD")
-    use_tls = os.getenv("SMTP_TLS", "true").lower() in ("1", "true", "yes")
-
-    if not smtp_host or not business.email:
-        raise RuntimeError("Email is not configured. Set SMTP_* env vars and business email.")
-
-    msg = EmailMessage()
-    msg["Subject"] = f"New Ink Order: {order.color} - {order.quantity_liters} L"
-    msg["From"] = smtp_user if smtp_user else business.email
-    msg["To"] = business.email
-
-    body = (
-        f"New Ink Order Received\n\n"
-        f"Customer: {order.customer_name}\n"
-        f"Email: {order.customer_email}\n"
-        f"Phone: {order.customer_phone or '-'}\n\n"
-        f"Color: {order.color}\n"
-        f"Quantity (L): {order.quantity_liters}\n"
-        f"Delivery Address: {order.delivery_address or '-'}\n\n"
-        f"Message:\n{order.message or '-'}\n"
-    )
-    msg.set_content(body)
-
-    with smtplib.SMTP(smtp_host, smtp_port) as server:
-        if use_tls:
-            server.starttls()
-        if smtp_user and smtp_pass:
-            server.login(smtp_user, smtp_pass)
-        server.send_message(msg)
+async def get_business_details(request: Request):
+    etag = await _etag(request, "business")
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    return Response(await business_cache.get_json(), media_type="application/json", headers=headers)
 
 @app.post("/orders/ink")
-def create_ink_order(order: InkOrder, background_tasks: BackgroundTasks):
+async def create_ink_order(order: InkOrder):
     # Store order
-    create_document("inkorder", order)
+    if order_committer is not None:
+        await order_committer.insert(order)
+    else:
+        await create_document_async("inkorder", order)
     # Fetch business email
-    business_docs = get_documents("business", {})
-    if not business_docs:
+    business = await business_cache.get()
+    if business is None:
         # Order stored, but cannot email without business configured
         return {"status": "stored", "email": "not_configured"}
-    business = Business(**{k: v for k, v in business_docs[0].items() if k != "_id"})
-    # Send email in background
-    try:
-        background_tasks.add_task(send_order_email, order, business)
-    except Exception:
-        # ignore email config errors here; order is stored
-        pass
+    # Queue the email; email_outbox.py sends it outside the web workers
+    email = new_order_email(order, business)
+    if outbox_committer is not None:
+        await outbox_committer.insert(email)
+    else:
+        await create_document_async(OUTBOX_COLLECTION, email)
     return {"status": "ok"}
 
 # ---------- Admin Endpoints ----------
@@ -142,71 +340,171 @@ def create_ink_order(order: InkOrder, background_tasks: BackgroundTasks):
 class AdminProduct(Product):
     id: Optional[str] = None
 
+class BulkDelete(BaseModel):
+    ids: List[str]
+
+async def _existing_product_ids(oids: List[ObjectId]) -> set:
+    docs = await get_documents_async("product", {"_id": {"$in": oids}}, projection={"_id": 1})
+    return {d["_id"] for d in docs}
+
 @app.get("/admin/products")
-def admin_list_products(x_admin_token: Optional[str] = Header(None)):
+async def admin_list_products(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    fields: Optional[str] = Query(None, description="Comma-separated Product fields to return"),
+    x_admin_token: Optional[str] = Header(None),
+):
     # auth
     if x_admin_token != ADMIN_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    docs = get_documents("product", {})
+    projection = _parse_fields(fields)
+    paginated = limit is not None or cursor is not None
+    if paginated:
+        docs, cursor_out, total = await _fetch_page("product", {}, limit, cursor, include_total, projection)
+    else:
+        docs = await get_documents_async("product", {}, projection=projection)
     # include _id as string
     out = []
     for d in docs:
         d["id"] = str(d.get("_id"))
         d.pop("_id", None)
         out.append(d)
-    return out
+    # Returned as a response directly so ObjectId/datetime values skip jsonable_encoder
+    if paginated:
+        return FastJSONResponse({"items": out, "next_cursor": cursor_out, "total": total})
+    return FastJSONResponse(out)
 
 @app.post("/admin/products")
-def admin_create_product(product: Product, x_admin_token: Optional[str] = Header(None)):
+async def admin_create_product(product: Product, x_admin_token: Optional[str] = Header(None)):
     if x_admin_token != ADMIN_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    inserted_id = create_document("product", product)
+    inserted_id = await create_document_async("product", product)
+    await _catalog_changed(upserted={inserted_id: product.model_dump()})
     return {"id": inserted_id}
 
+@app.post("/admin/products/bulk")
+async def admin_bulk_create_products(products: List[Product], x_admin_token: Optional[str] = Header(None)):
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    results = await create_documents_async("product", products)
+    await _catalog_changed(upserted={r["id"]: products[r["index"]].model_dump() for r in results if "id" in r})
+    return {"created": sum(1 for r in results if "id" in r), "results": results}
+
+@app.put("/admin/products/bulk")
+async def admin_bulk_update_products(products: List[AdminProduct], x_admin_token: Optional[str] = Header(None)):
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    results = [{"index": i, "id": p.id, "status": "invalid_id"} for i, p in enumerate(products)]
+    valid = [i for i, p in enumerate(products) if p.id and ObjectId.is_valid(p.id)]
+    existing = await _existing_product_ids([ObjectId(products[i].id) for i in valid])
+    ops, op_items = [], []
+    for i in valid:
+        oid = ObjectId(products[i].id)
+        if oid not in existing:
+            results[i]["status"] = "not_found"
+            continue
+        ops.append(update_operation({"_id": oid}, products[i].model_dump(exclude={"id"})))
+        op_items.append(i)
+        results[i]["status"] = "updated"
+    summary = await bulk_write_async("product", ops) if ops else {"errors": {}}
+    for op_index, message in summary["errors"].items():
+        results[op_items[op_index]].update(status="error", error=message)
+    await _catalog_changed(upserted={
+        r["id"]: products[r["index"]].model_dump(exclude={"id"}) for r in results if r["status"] == "updated"
+    })
+    return {"updated": sum(1 for r in results if r["status"] == "updated"), "results": results}
+
+@app.delete("/admin/products/bulk")
+async def admin_bulk_delete_products(payload: BulkDelete, x_admin_token: Optional[str] = Header(None)):
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    results = [{"index": i, "id": pid, "status": "invalid_id"} for i, pid in enumerate(payload.ids)]
+    valid = [i for i, pid in enumerate(payload.ids) if ObjectId.is_valid(pid)]
+    existing = await _existing_product_ids([ObjectId(payload.ids[i]) for i in valid])
+    ops, op_items = [], []
+    for i in valid:
+        oid = ObjectId(payload.ids[i])
+        if oid not in existing:
+            results[i]["status"] = "not_found"
+            continue
+        ops.append(DeleteOne({"_id": oid}))
+        op_items.append(i)
+        results[i]["status"] = "deleted"
+    summary = await bulk_write_async("product", ops) if ops else {"errors": {}}
+    for op_index, message in summary["errors"].items():
+        results[op_items[op_index]].update(status="error", error=message)
+    await _catalog_changed(deleted=[r["id"] for r in results if r["status"] == "deleted"])
+    return {"deleted": sum(1 for r in results if r["status"] == "deleted"), "results": results}
+
+@app.post("/admin/products/import")
+async def admin_import_products(
+    request: Request,
+    fmt: Optional[str] = Query(None, alias="format", description="csv or jsonl; defaults from Content-Type"),
+    upsert_key: Optional[str] = Query(None, description="Upsert on this field (title) instead of inserting"),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """Import a CSV or JSON Lines file sent as the raw request body"""
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    fmt = fmt or guess_format(request.headers.get("content-type"))
+    try:
+        check_options(fmt, upsert_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # The body is read as the import consumes it, never held in full
+    stream = io.BufferedReader(AsyncStreamReader(request.stream(), asyncio.get_running_loop()))
+    report = await asyncio.to_thread(import_products, stream, fmt, upsert_key)
+    # Imports are too large to apply incrementally; this schedules the rebuilds
+    await _catalog_changed()
+    return report
+
 @app.put("/admin/products/{product_id}")
-def admin_update_product(product_id: str, product: Product, x_admin_token: Optional[str] = Header(None)):
+async def admin_update_product(product_id: str, product: Product, x_admin_token: Optional[str] = Header(None)):
     if x_admin_token != ADMIN_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized")
     if not ObjectId.is_valid(product_id):
         raise HTTPException(status_code=400, detail="Invalid ID")
-    res = _collection("product").update_one({"_id": ObjectId(product_id)}, {"$set": {**product.model_dump()}})
-    if res.matched_count == 0:
+    matched = await update_document_async("product", {"_id": ObjectId(product_id)}, product)
+    if matched == 0:
         raise HTTPException(status_code=404, detail="Not found")
+    await _catalog_changed(upserted={product_id: product.model_dump()})
     return {"updated": True}
 
 @app.delete("/admin/products/{product_id}")
-def admin_delete_product(product_id: str, x_admin_token: Optional[str] = Header(None)):
+async def admin_delete_product(product_id: str, x_admin_token: Optional[str] = Header(None)):
     if x_admin_token != ADMIN_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized")
     if not ObjectId.is_valid(product_id):
         raise HTTPException(status_code=400, detail="Invalid ID")
-    res = _collection("product").delete_one({"_id": ObjectId(product_id)})
-    if res.deleted_count == 0:
+    deleted = await delete_document_async("product", {"_id": ObjectId(product_id)})
+    if deleted == 0:
         raise HTTPException(status_code=404, detail="Not found")
+    await _catalog_changed(deleted=[product_id])
     return {"deleted": True}
 
 @app.get("/admin/business")
-def admin_get_business(x_admin_token: Optional[str] = Header(None)):
+async def admin_get_business(x_admin_token: Optional[str] = Header(None)):
     if x_admin_token != ADMIN_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    docs = get_documents("business", {})
-    if not docs:
+    d = await business_cache.get_document()
+    if not d:
         return None
-    d = docs[0]
     d["id"] = str(d.get("_id"))
     d.pop("_id", None)
     return d
 
 @app.put("/admin/business")
-def admin_upsert_business(business: Business, x_admin_token: Optional[str] = Header(None)):
+async def admin_upsert_business(business: Business, x_admin_token: Optional[str] = Header(None)):
     if x_admin_token != ADMIN_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    docs = get_documents("business", {})
-    if not docs:
-        create_document("business", business)
+    existing = await find_one_async("business", {})
+    if not existing:
+        await create_document_async("business", business)
+        await business_cache.load()
         return {"created": True}
-    _id = docs[0]["_id"]
-    _collection("business").update_one({"_id": _id}, {"$set": {**business.model_dump()}})
+    await update_document_async("business", {"_id": existing["_id"]}, business)
+    await business_cache.load()
     return {"updated": True}
 
 if __name__ == "__main__":
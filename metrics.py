@@ -0,0 +1,252 @@
+"""
+Prometheus Metrics
+
+Exposed on GET /metrics:
+
+- per-route request counts and latency histograms (MetricsMiddleware)
+- per-collection/command Mongo latency (MongoCommandMetrics, a pymongo
+  CommandListener registered on both clients in database.py)
+- connection-pool checkout wait and checked-out connections (PoolMetrics)
+- thread-pool saturation, sampled on scrape from motor's executor (where
+  Mongo I/O runs) and the event loop's default executor (asyncio.to_thread:
+  snapshot, search index and import work)
+- admission control queue depth, waits and rejections (admission.py)
+- email send outcomes and durations (recorded by mailer.py; the outbox worker
+  serves them on its own port, see email_outbox.py)
+
+Under serve.py several gunicorn workers share one port, so PROMETHEUS_MULTIPROC_DIR
+is set and every process writes its metrics to files there. A scrape of any
+worker then merges all live workers: counters and histograms are summed,
+gauges are summed over live processes, and the executor gauges keep the
+latest sample (taken by whichever worker answers a scrape).
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from motor.frameworks import asyncio as motor_asyncio
+from prometheus_client import multiprocess
+from pymongo import monitoring
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+REQUEST_COUNT = Counter(
+    "http_requests_total", "HTTP requests by route template, method and status", ["route", "method", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ["route", "method"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled", multiprocess_mode="livesum"
+)
+
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ["collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+MONGO_COMMAND_FAILURES = Counter("mongo_command_failures_total", "Failed MongoDB commands", ["collection", "command"])
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting to check out a pooled Mongo connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+POOL_CHECKOUT_FAILURES = Counter("mongo_pool_checkout_failures_total", "Failed connection checkouts", ["reason"])
+POOL_CHECKED_OUT = Gauge(
+    "mongo_pool_checked_out_connections", "Mongo connections currently checked out", multiprocess_mode="livesum"
+)
+POOL_CONNECTIONS = Gauge("mongo_pool_connections", "Open Mongo connections across pools", multiprocess_mode="livesum")
+
+EXECUTOR_MAX_THREADS = Gauge(
+    "executor_max_threads", "Thread limit of a thread-pool executor", ["executor"], multiprocess_mode="livemostrecent"
+)
+EXECUTOR_THREADS = Gauge(
+    "executor_threads", "Threads started by a thread-pool executor", ["executor"], multiprocess_mode="livemostrecent"
+)
+EXECUTOR_BUSY = Gauge(
+    "executor_busy_threads", "Executor threads running a work item", ["executor"], multiprocess_mode="livemostrecent"
+)
+EXECUTOR_QUEUED = Gauge(
+    "executor_queued_work_items", "Work items waiting for an executor thread", ["executor"],
+    multiprocess_mode="livemostrecent",
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight_requests", "Admitted requests being handled", ["route_class"], multiprocess_mode="livesum"
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth", "Requests waiting for admission", ["route_class"], multiprocess_mode="livesum"
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds", "Time admitted requests spent queued", ["route_class"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Requests shed with 503", ["route_class", "reason"])
+
+EMAIL_SENT = Counter("email_send_total", "Email send attempts by outcome", ["outcome"])
+EMAIL_SEND_SECONDS = Histogram(
+    "email_send_duration_seconds", "Time to hand one email to the SMTP server",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+# ---------- HTTP ----------
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request under its route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            # FastAPI stores the matched route in the scope; label by its template
+            # (/admin/products/{product_id}) to keep cardinality bounded
+            route = scope.get("route")
+            label = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_LATENCY.labels(label, method).observe(time.perf_counter() - start)
+            REQUEST_COUNT.labels(label, method, str(status[0])).inc()
+
+
+# ---------- Executors ----------
+
+def _sample_executor(name: str, executor):
+    """Record a ThreadPoolExecutor's size, busy threads and backlog
+
+    Reads CPython's ThreadPoolExecutor internals: idle threads release
+    _idle_semaphore, and submitted items wait in _work_queue.
+    """
+    if executor is None:
+        return
+    threads = len(getattr(executor, "_threads", ()))
+    idle = getattr(getattr(executor, "_idle_semaphore", None), "_value", 0)
+    queue = getattr(executor, "_work_queue", None)
+    EXECUTOR_MAX_THREADS.labels(name).set(getattr(executor, "_max_workers", 0))
+    EXECUTOR_THREADS.labels(name).set(threads)
+    EXECUTOR_BUSY.labels(name).set(max(threads - idle, 0))
+    EXECUTOR_QUEUED.labels(name).set(queue.qsize() if queue is not None else 0)
+
+
+def sample_executors():
+    # Looked up on every scrape: motor replaces its executor after a fork, and
+    # the loop creates its default executor on first use
+    _sample_executor("motor", getattr(motor_asyncio, "_EXECUTOR", None))
+    _sample_executor("default", getattr(asyncio.get_running_loop(), "_default_executor", None))
+
+
+def render_latest():
+    """(body, content type) for a /metrics scrape; call from the event loop"""
+    sample_executors()
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, MULTIPROC_DIR)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+# ---------- MongoDB ----------
+
+def command_collection(event) -> str:
+    """Collection a started command targets ("" for admin commands like ping)"""
+    target = event.command.get(event.command_name)
+    if isinstance(target, str):
+        return target
+    collection = event.command.get("collection")  # getMore
+    return collection if isinstance(collection, str) else ""
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._inflight = {}
+
+    def started(self, event):
+        self._inflight[(event.connection_id, event.request_id)] = command_collection(event)
+
+    def succeeded(self, event):
+        collection = self._inflight.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._inflight.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Checkout wait time; a checkout starts and finishes on the same thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _wait(self) -> float:
+        start = getattr(self._local, "start", None)
+        self._local.start = None
+        return time.perf_counter() - start if start is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.start = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        POOL_CHECKOUT_WAIT.observe(self._wait())
+        POOL_CHECKED_OUT.inc()
+
+    def connection_check_out_failed(self, event):
+        POOL_CHECKOUT_WAIT.observe(self._wait())
+        POOL_CHECKOUT_FAILURES.labels(str(event.reason)).inc()
+
+    def connection_checked_in(self, event):
+        POOL_CHECKED_OUT.dec()
+
+    def connection_created(self, event):
+        POOL_CONNECTIONS.inc()
+
+    def connection_closed(self, event):
+        POOL_CONNECTIONS.dec()
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+
+def _gauge_value(gauge) -> float:
+    return gauge.collect()[0].samples[0].value
+
+
+def pool_stats() -> dict:
+    """Open and checked-out Mongo connections in this process, across clients"""
+    return {"connections": int(_gauge_value(POOL_CONNECTIONS)), "checked_out": int(_gauge_value(POOL_CHECKED_OUT))}
+
+
+def mongo_event_listeners() -> list:
+    return [MongoCommandMetrics(), PoolMetrics()]
@@ -0,0 +1,37 @@
+"""
+Keyset Pagination Helpers
+
+Cursors are opaque to clients: the urlsafe base64 of the last returned _id.
+Pages are fetched with an ``_id > last_id`` range query, so a page costs the
+same no matter how deep into the collection it is.
+"""
+
+import base64
+import binascii
+
+from bson.objectid import ObjectId
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(last_id: ObjectId) -> str:
+    return base64.urlsafe_b64encode(last_id.binary).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+    """Decode a cursor from encode_cursor, raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid cursor")
+    if len(raw) != 12:
+        raise ValueError("Invalid cursor")
+    return ObjectId(raw)
+
+
+def next_cursor(docs: list, has_more: bool):
+    """Cursor for the page after docs, or None on the last page"""
+    if not has_more or not docs:
+        return None
+    return encode_cursor(docs[-1]["_id"])
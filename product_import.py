@@ -0,0 +1,306 @@
+"""
+Product Import
+
+Loads supplier catalogs into the product collection, from
+POST /admin/products/import or the command line:
+
+    python product_import.py catalog.csv [--upsert-key title]
+
+Files are CSV with a header row of Product field names, or JSON Lines with one
+product object per line. The file is read as a stream and cut into batches of
+IMPORT_BATCH_SIZE rows. A process pool validates the batches against
+schemas.Product, while this process writes the batches already validated with
+unordered insert_many, or bulk upserts keyed on the product title. Only a
+few batches per validation worker are in flight at any time, so memory stays
+flat however large the file is.
+
+Rows that fail validation or whose write fails are reported by line number
+and skipped, as are lines that are not valid UTF-8 or CSV. The rest of the
+file is still imported. An error that stops the import (the upload breaking
+off, Mongo going away) is recorded as "aborted" in the report, and the report
+still covers everything written up to that point.
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from database import bulk_write, create_documents, update_operation
+from schemas import Product
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))  # listed in the report; all are counted
+
+FORMATS = ("csv", "jsonl")
+# Fields that identify a product and are always present. Optional or shared
+# values (in_stock, price, a missing description) would match unrelated
+# products and overwrite them
+UPSERT_KEYS = ("title",)
+_FORMAT_HINTS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/x-jsonlines": "jsonl",
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+
+def guess_format(hint: Optional[str]) -> Optional[str]:
+    """Import format from a Content-Type header or a file name"""
+    if not hint:
+        return None
+    hint = hint.split(";")[0].strip().lower()
+    return _FORMAT_HINTS.get(hint) or _FORMAT_HINTS.get(os.path.splitext(hint)[1])
+
+
+def check_options(fmt: Optional[str], upsert_key: Optional[str]):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown import format {fmt!r}; expected one of: {', '.join(FORMATS)}")
+    if upsert_key is not None and upsert_key not in UPSERT_KEYS:
+        raise ValueError(f"Invalid upsert key {upsert_key!r}; expected one of: {', '.join(UPSERT_KEYS)}")
+
+
+# ---------- Reading ----------
+
+class AsyncStreamReader(io.RawIOBase):
+    """Blocking file object over an async byte iterator such as Request.stream()
+
+    For use from a worker thread: each read waits for the next chunk on the
+    event loop, so the upload is consumed only as fast as it is imported.
+    """
+
+    def __init__(self, chunks, loop: asyncio.AbstractEventLoop):
+        self._chunks = chunks.__aiter__()
+        self._loop = loop
+        self._buffer = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    async def _next(self) -> Optional[bytes]:
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            chunk = asyncio.run_coroutine_threadsafe(self._next(), self._loop).result()
+            if chunk is None:
+                return 0
+            self._buffer = memoryview(chunk)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _lines(stream, bad_lines: set) -> Iterator[str]:
+    """Decode a binary stream line by line; undecodable lines are replaced and noted"""
+    for number, raw in enumerate(stream, 1):
+        try:
+            yield raw.decode("utf-8-sig" if number == 1 else "utf-8")
+        except UnicodeDecodeError:
+            bad_lines.add(number)
+            yield raw.decode("utf-8", errors="replace")
+
+
+def _records(stream, fmt: str) -> Iterator[Tuple[int, object]]:
+    """(line number, record) from a binary stream
+
+    Records are CSV rows as dicts or JSON Lines unparsed. A line that cannot
+    be read gives a ValueError instead, which validation reports for that row.
+    """
+    bad_lines = set()
+    lines = _lines(stream, bad_lines)
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        first_line = 1
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # The reader resets and carries on with the next line
+                row = ValueError(f"unreadable CSV: {e}")
+            # DictReader.line_num is only updated on success
+            line = reader.reader.line_num
+            # A quoted field may span lines; the row is bad if any of them is
+            if bad_lines.intersection(range(first_line, line + 1)):
+                row = ValueError("invalid UTF-8")
+            bad_lines.clear()
+            first_line = line + 1
+            yield line, row
+    else:
+        for number, line in enumerate(lines, 1):
+            if number in bad_lines:
+                yield number, ValueError("invalid UTF-8")
+            elif line.strip():
+                yield number, line
+
+
+def _batches(records: Iterator, size: int) -> Iterator[list]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ---------- Validation (runs in the process pool) ----------
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}" for e in exc.errors())
+
+
+def _validate(fmt: str, upsert_key: Optional[str], batch: list) -> Tuple[list, list]:
+    """[(line, record)] -> ([(line, product dict)], [{"line", "error"}])"""
+    products, errors = [], []
+    for line, record in batch:
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            if fmt == "jsonl":
+                record = json.loads(record)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+            else:
+                # Empty cells are "not given": defaults apply and required fields fail
+                record = {k: v for k, v in record.items() if k is not None and v not in ("", None)}
+            product = Product.model_validate(record).model_dump()
+            if upsert_key is not None and not str(product[upsert_key]).strip():
+                raise ValueError(f"{upsert_key}: empty upsert key")
+            products.append((line, product))
+        except ValidationError as e:
+            errors.append({"line": line, "error": _describe(e)})
+        except ValueError as e:
+            errors.append({"line": line, "error": str(e)})
+    return products, errors
+
+
+# ---------- Writing ----------
+
+def _new_report() -> dict:
+    return {
+        "rows": 0, "inserted": 0, "updated": 0, "invalid": 0, "failed": 0,
+        "errors": [], "errors_truncated": False, "aborted": None,
+    }
+
+
+def _add_errors(report: dict, errors: List[dict]):
+    room = IMPORT_MAX_ERRORS - len(report["errors"])
+    report["errors"].extend(errors[:room])
+    report["errors_truncated"] = report["errors_truncated"] or len(errors) > room
+
+
+def _write(report: dict, products: list, upsert_key: Optional[str]) -> List[dict]:
+    """Write validated products, returns {"line", "error"} for failed writes"""
+    if not products:
+        return []
+    lines = [line for line, _ in products]
+    if upsert_key is None:
+        results = create_documents("product", [product for _, product in products])
+        failed = {r["index"]: r["error"] for r in results if "error" in r}
+        report["inserted"] += len(products) - len(failed)
+    else:
+        summary = bulk_write("product", [
+            update_operation({upsert_key: product[upsert_key]}, product, upsert=True) for _, product in products
+        ])
+        failed = summary["errors"]
+        report["inserted"] += summary["upserted"]
+        report["updated"] += summary["matched"]
+    report["failed"] += len(failed)
+    return [{"line": lines[i], "error": message} for i, message in failed.items()]
+
+
+def _store(report: dict, validated: Tuple[list, list], upsert_key: Optional[str]):
+    products, errors = validated
+    report["rows"] += len(products) + len(errors)
+    report["invalid"] += len(errors)
+    errors = errors + _write(report, products, upsert_key)
+    _add_errors(report, sorted(errors, key=lambda e: e["line"]))
+
+
+def _completed(result) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def import_products(stream, fmt: str, upsert_key: Optional[str] = None,
+                    workers: int = IMPORT_WORKERS, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """Import products from a binary stream; blocking, returns the report
+
+    workers=0 validates in this process, which is simpler for small files.
+    Never raises once the options are valid: a failure that stops the import
+    is recorded in report["aborted"].
+    """
+    check_options(fmt, upsert_key)
+    report = _new_report()
+    # spawn, not fork: the server process has an event loop, threads and Mongo clients
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) if workers > 0 else None
+    pending = deque()
+    try:
+        for batch in _batches(_records(stream, fmt), batch_size):
+            if pool is not None:
+                pending.append(pool.submit(_validate, fmt, upsert_key, batch))
+            else:
+                pending.append(_completed(_validate(fmt, upsert_key, batch)))
+            # Write in file order while later batches validate; cap what is held in memory
+            while len(pending) > max(workers, 1) * 2:
+                _store(report, pending.popleft().result(), upsert_key)
+        while pending:
+            _store(report, pending.popleft().result(), upsert_key)
+    except Exception as e:
+        # Batches already written stay written; the report says how far it got
+        logger.exception("Product import aborted")
+        report["aborted"] = str(e) or type(e).__name__
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return report
+
+
+if __name__ == "__main__":
+    from database import get_db
+
+    parser = argparse.ArgumentParser(description="Import products from a CSV or JSON Lines file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="Defaults from the file extension")
+    parser.add_argument("--upsert-key", choices=UPSERT_KEYS, help="Upsert on this field instead of inserting")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS, help="Validation processes; 0 validates inline")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or guess_format(args.path)
+    try:
+        check_options(fmt, args.upsert_key)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if get_db() is None:
+        raise SystemExit("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    with open(args.path, "rb") as f:
+        report = import_products(f, fmt, args.upsert_key, args.workers, args.batch_size)
+    print(json.dumps(report, indent=2))
+    if report["invalid"] or report["failed"] or report["aborted"]:
+        raise SystemExit(1)
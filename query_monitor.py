@@ -0,0 +1,142 @@
+"""
+Query Monitoring
+
+SlowQueryLogger is a pymongo CommandListener (registered in database.py) that
+logs every command slower than SLOW_QUERY_MS with its collection, filter shape
+and duration. Filter shapes keep field names and operators but replace values
+with "?", so they group by query pattern and never log customer data.
+
+With QUERY_EXPLAIN=true (meant for dev/CI), get_documents runs explain() once
+per distinct collection + filter shape and warns when the winning plan is a
+COLLSCAN, so missing indexes show up before production.
+"""
+
+import json
+import logging
+import os
+import threading
+
+from pymongo import monitoring
+
+from metrics import command_collection
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+QUERY_EXPLAIN = os.getenv("QUERY_EXPLAIN", "false").lower() in ("1", "true", "yes")
+
+
+def _shape(value):
+    if isinstance(value, dict):
+        return {k: _shape(v) for k, v in value.items()}
+    if isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+        # $and / $or / $nor clauses
+        return [_shape(v) for v in value]
+    return "?"
+
+
+def filter_shape(filter_dict) -> str:
+    """Canonical shape of a filter, e.g. {"price": {"$gte": "?"}}"""
+    return json.dumps(_shape(filter_dict or {}), sort_keys=True)
+
+
+def command_filter(command_name: str, command) -> dict:
+    """Best-effort filter of a started command"""
+    if command_name == "find":
+        return command.get("filter") or {}
+    if command_name in ("count", "distinct", "findAndModify"):
+        return command.get("query") or {}
+    if command_name in ("update", "delete"):
+        key = "updates" if command_name == "update" else "deletes"
+        statements = command.get(key) or []
+        return statements[0].get("q", {}) if statements else {}
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or []
+        return pipeline[0].get("$match", {}) if pipeline and isinstance(pipeline[0], dict) else {}
+    return {}
+
+
+class SlowQueryLogger(monitoring.CommandListener):
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS):
+        self.threshold_ms = threshold_ms
+        self._inflight = {}
+
+    def started(self, event):
+        self._inflight[(event.connection_id, event.request_id)] = (
+            command_collection(event), command_filter(event.command_name, event.command)
+        )
+
+    def _finished(self, event, failed: bool):
+        collection, filter_dict = self._inflight.pop((event.connection_id, event.request_id), ("", {}))
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+        logger.warning(
+            "Slow Mongo command %s on %s took %.1f ms%s filter=%s",
+            event.command_name, collection or "-", duration_ms, " (failed)" if failed else "", filter_shape(filter_dict),
+        )
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+
+# ---------- explain() in dev/CI ----------
+
+_explained = set()
+_explained_lock = threading.Lock()
+
+
+def _first_time(collection_name: str, filter_dict) -> bool:
+    key = (collection_name, filter_shape(filter_dict))
+    with _explained_lock:
+        if key in _explained:
+            return False
+        _explained.add(key)
+        return True
+
+
+def _has_collscan(plan) -> bool:
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(_has_collscan(v) for v in plan.values())
+    if isinstance(plan, list):
+        return any(_has_collscan(v) for v in plan)
+    return False
+
+
+def _report(collection_name: str, filter_dict, explanation: dict):
+    winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+    if _has_collscan(winning_plan):
+        logger.warning(
+            "COLLSCAN on %s for filter %s; add an index to schemas.INDEXES",
+            collection_name, filter_shape(filter_dict),
+        )
+
+
+def should_explain(collection_name: str, filter_dict) -> bool:
+    # Unfiltered reads are full scans by design (e.g. the catalog snapshot)
+    return QUERY_EXPLAIN and bool(filter_dict) and _first_time(collection_name, filter_dict)
+
+
+def check_plan(collection, filter_dict):
+    """Explain filter_dict once per shape and warn on COLLSCAN"""
+    if not should_explain(collection.name, filter_dict):
+        return
+    try:
+        _report(collection.name, filter_dict, collection.find(filter_dict).explain())
+    except Exception:
+        logger.exception("explain() failed on %s", collection.name)
+
+
+async def check_plan_async(collection, filter_dict):
+    """Explain filter_dict once per shape and warn on COLLSCAN"""
+    if not should_explain(collection.name, filter_dict):
+        return
+    try:
+        _report(collection.name, filter_dict, await collection.find(filter_dict).explain())
+    except Exception:
+        logger.exception("explain() failed on %s", collection.name)
@@ -31,3 +31,58 @@ class InkOrder(BaseModel):
 
 class AdminAuth(BaseModel):
     token: str
+
+class FacetValue(BaseModel):
+    value: str
+    count: int
+
+class PriceBucket(BaseModel):
+    min: float
+    max: Optional[float] = Field(None, description="Exclusive upper bound; null for the last bucket")
+    count: int
+
+class ProductFacets(BaseModel):
+    total: int
+    categories: List[FacetValue] = Field(..., description="Counts ignore the category filter itself")
+    in_stock: List[FacetValue]
+    price: List[PriceBucket]
+
+class ProductPage(BaseModel):
+    items: List[Product]
+    next_cursor: Optional[str] = Field(None, description="Pass as ?cursor= to fetch the next page")
+    total: Optional[int] = Field(None, description="Total matching products, when requested")
+    facets: Optional[ProductFacets] = Field(None, description="Facet counts, when requested with ?facets=true")
+
+# Index specs per collection, reconciled by indexes.py at startup and before
+# deploys. Each entry is (keys, options) as accepted by create_index; every
+# index needs an explicit name so reconciliation can match it.
+INDEXES = {
+    "product": [
+        # list_products(category=...) plus keyset pages within a category
+        ([("category", 1), ("_id", 1)], {"name": "category_1__id_1"}),
+        # min_price / max_price filters and the facet counts under them
+        ([("price", 1)], {"name": "price_1"}),
+        # product_import upserts keyed on title; one lookup per imported row
+        ([("title", 1)], {"name": "title_1"}),
+    ],
+    "inkorder": [
+        ([("created_at", -1)], {"name": "created_at_-1"}),
+    ],
+    "email_outbox": [
+        # email_outbox.claim(): due pending emails and expired "sending" leases
+        ([("status", 1), ("next_attempt_at", 1)], {"name": "status_1_next_attempt_at_1"}),
+    ],
+    # Collections used by schema_examples.py
+    "users": [
+        ([("email", 1)], {"name": "email_1"}),
+    ],
+    "posts": [
+        ([("author_id", 1), ("created_at", -1)], {"name": "author_id_1_created_at_-1"}),
+    ],
+    "messages": [
+        ([("room_id", 1), ("created_at", 1)], {"name": "room_id_1_created_at_1"}),
+    ],
+    "bookings": [
+        ([("event_id", 1)], {"name": "event_id_1"}),
+    ],
+}
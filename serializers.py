@@ -0,0 +1,40 @@
+"""
+Trusted Read Path Serializers
+
+Catalog documents were validated against schemas.Product when the admin
+endpoints wrote them, so the read endpoints skip a second Product(**doc) +
+response_model pass. They pick the Product fields out of the Mongo dicts and
+encode them straight to JSON bytes with the app codec.
+"""
+
+from typing import Any, List, Optional
+
+from codec import dumps
+from schemas import Product
+
+# (field name, default) for every Product field; required fields default to None
+_PRODUCT_FIELDS = tuple(
+    (name, None if field.is_required() else field.get_default(call_default_factory=True))
+    for name, field in Product.model_fields.items()
+)
+
+
+def json_bytes(content: Any) -> bytes:
+    """Encode plain Python content (dicts, lists, datetimes, ObjectIds) to JSON"""
+    return dumps(content)
+
+
+def product_dicts(docs: List[dict]) -> List[dict]:
+    """Product-shaped dicts (no _id, defaults filled in) from Mongo documents"""
+    return [{name: doc.get(name, default) for name, default in _PRODUCT_FIELDS} for doc in docs]
+
+
+def product_list_json(docs: List[dict]) -> bytes:
+    return json_bytes(product_dicts(docs))
+
+
+def product_page_json(docs: List[dict], next_cursor: Optional[str], total: Optional[int], facets: Optional[dict] = None) -> bytes:
+    page = {"items": product_dicts(docs), "next_cursor": next_cursor, "total": total}
+    if facets is not None:
+        page["facets"] = facets
+    return json_bytes(page)
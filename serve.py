@@ -0,0 +1,151 @@
+"""
+Production Server
+
+Runs the API under gunicorn with uvicorn workers (uvloop + httptools):
+
+    python serve.py
+
+WEB_CONCURRENCY workers (default: one per available core) each import the app
+after the fork, so every worker opens its own Mongo clients and runs the
+startup warmup (see warmup.py) before it accepts connections. Workers are
+recycled after MAX_REQUESTS (+ random jitter) requests to cap slow leaks.
+
+Indexes are reconciled once per start, by python indexes.py run from the
+master in the background, instead of in every worker (and again after every
+recycle). ENSURE_INDEXES_ON_STARTUP=false skips it, e.g. when indexes.py runs
+as a deploy step; workers always get it set to false.
+
+Prometheus metrics run in multiprocess mode, so /metrics on any worker
+reports all of them (see metrics.py). PROMETHEUS_MULTIPROC_DIR defaults to a
+fresh temporary directory and is emptied at startup; the files of exited
+workers are marked dead so their gauges drop out.
+
+Signals to the master process:
+
+    HUP    graceful reload: start new workers, then retire the old ones
+    TERM   graceful shutdown, waiting up to GRACEFUL_TIMEOUT seconds
+    TTIN / TTOU   add / remove one worker
+"""
+
+import atexit
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from gunicorn.app.base import BaseApplication
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+APP_MODULE = os.getenv("APP_MODULE", "main:app")
+BIND = os.getenv("BIND", f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}")
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0")) or default_workers()
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "10000"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+TIMEOUT = int(os.getenv("TIMEOUT", "60"))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+KEEPALIVE = int(os.getenv("KEEPALIVE", "5"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+ENSURE_INDEXES_ON_STARTUP = os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+_index_process = None
+
+
+def post_fork(server, worker):
+    server.log.info("Worker %s spawned", worker.pid)
+
+
+def worker_exit(server, worker):
+    server.log.info("Worker %s exited", worker.pid)
+
+
+def child_exit(server, worker):
+    # Runs in the master; the import is safe there, no metrics are recorded
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    global _index_process
+    server.log.info("Serving %s on %s with %d workers", APP_MODULE, BIND, WEB_CONCURRENCY)
+    if ENSURE_INDEXES_ON_STARTUP:
+        # A child process, so the master never opens a Mongo client; workers serve meanwhile
+        _index_process = subprocess.Popen([sys.executable, os.path.join(ROOT, "indexes.py")], cwd=ROOT)
+
+
+class Server(BaseApplication):
+    def __init__(self, app_uri: str = APP_MODULE, **options):
+        self.app_uri = app_uri
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Imported in the worker, never in the master, so nothing that holds
+        # sockets or threads (Mongo clients, executors) crosses the fork
+        from gunicorn.util import import_app
+
+        return import_app(self.app_uri)
+
+
+def options() -> dict:
+    return {
+        "bind": BIND,
+        "workers": WEB_CONCURRENCY,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": False,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS_JITTER,
+        "timeout": TIMEOUT,
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "keepalive": KEEPALIVE,
+        "loglevel": LOG_LEVEL,
+        "accesslog": os.getenv("ACCESS_LOG"),
+        "post_fork": post_fork,
+        "worker_exit": worker_exit,
+        "child_exit": child_exit,
+        "when_ready": when_ready,
+    }
+
+
+def _remove_metrics_dir(path: str, master_pid: int):
+    # Workers inherit atexit handlers; only the master removes the directory
+    if os.getpid() == master_pid:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def prepare_metrics_dir():
+    """Point PROMETHEUS_MULTIPROC_DIR at an empty directory before any worker starts"""
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path is None:
+        path = tempfile.mkdtemp(prefix="prometheus-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+        atexit.register(_remove_metrics_dir, path, os.getpid())
+        return
+    os.makedirs(path, exist_ok=True)
+    # Files left by a previous run would be merged into this one's metrics
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+
+
+if __name__ == "__main__":
+    prepare_metrics_dir()
+    # Reconciled once by when_ready, never per worker
+    os.environ["ENSURE_INDEXES_ON_STARTUP"] = "false"
+    Server(**options()).run()
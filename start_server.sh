@@ -1,10 +1,12 @@
 #!/bin/bash
+# Usage: ./start_server.sh          production: gunicorn + uvicorn workers (serve.py)
+#        ./start_server.sh --dev    single uvicorn process with --reload
 echo "Starting FastAPI backend server..."
 
-# Find and kill MainThread processes
-PIDS=$(ps | grep uvicorn | grep -v grep | awk '{print $1}')
+# Stop a previous server
+PIDS=$(ps | grep -E "uvicorn|serve.py" | grep -v grep | awk '{print $1}')
 if [ ! -z "$PIDS" ]; then
-  echo "Killing uvicorn processes: $PIDS"
+  echo "Killing server processes: $PIDS"
   for pid in $PIDS; do
     kill $pid 2>/dev/null || true
   done
@@ -14,6 +16,14 @@ fi
 mkdir -p logs
 echo "Installing dependencies..."
 pip install -r requirements.txt
+echo "Starting email outbox worker..."
+pkill -f "python email_outbox.py" 2>/dev/null || true
+nohup python email_outbox.py > logs/email_worker.log 2>&1 &
 echo "Starting FastAPI server..."
-nohup uvicorn main:app --host 0.0.0.0 --port 8000 --reload > logs/server.log 2>&1 
+if [ "$1" == "--dev" ]; then
+  nohup uvicorn main:app --host 0.0.0.0 --port 8000 --reload > logs/server.log 2>&1
+else
+  # Graceful reload: kill -HUP $(pgrep -f "python serve.py" | head -1)
+  nohup python serve.py > logs/server.log 2>&1
+fi
 echo "Server started in background"
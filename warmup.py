@@ -0,0 +1,28 @@
+"""
+Startup Warmup
+
+Coroutines registered with @warmup_hook run in registration order during app
+startup, in every worker process. Uvicorn (and so each gunicorn worker started
+by serve.py) completes lifespan startup before it accepts connections, so
+caches and snapshots are warm before a worker sees its first request.
+"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+_hooks = []
+
+
+def warmup_hook(fn):
+    """Register an async function to run at startup"""
+    _hooks.append(fn)
+    return fn
+
+
+async def run_warmup():
+    for hook in _hooks:
+        start = time.perf_counter()
+        await hook()
+        logger.info("Warmup %s took %.1f ms", hook.__name__, (time.perf_counter() - start) * 1000)